@@ -13,6 +13,7 @@ import argparse
 
 from src.email import update_emails
 from src.monitoring import monitoring_utils
+from src.utils import blob, blob_cache, run_cache
 from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -25,20 +26,24 @@ if __name__ == "__main__":
     run_fcast = args.fcast or not (args.fcast or args.obsv)
     run_obsv = args.obsv or not (args.fcast or args.obsv)
 
-    if run_fcast:
-        logger.info("Updating forecast monitoring data...")
-        monitoring_utils.update_fcast_monitoring()
-        logger.info("Updating forecast trigger emails...")
-        update_emails.update_fcast_trigger_emails()
-        logger.info("Updating forecast info emails...")
-        update_emails.update_fcast_info_emails()
-
-    if run_obsv:
-        logger.info("Updating observational monitoring data...")
-        monitoring_utils.update_obsv_monitoring()
-        logger.info("Updating observational trigger emails...")
-        update_emails.update_obsv_trigger_emails()
-        logger.info("Updating observational info emails...")
-        update_emails.update_obsv_info_emails()
-
+    # codab / CHIRPS-GEFS loaders are memoised until the run ends
+    with run_cache.run_scope():
+        if run_fcast:
+            logger.info("Updating forecast monitoring data...")
+            monitoring_utils.update_fcast_monitoring()
+            logger.info("Updating forecast trigger emails...")
+            update_emails.update_fcast_trigger_emails()
+            logger.info("Updating forecast info emails...")
+            update_emails.update_fcast_info_emails()
+
+        if run_obsv:
+            logger.info("Updating observational monitoring data...")
+            monitoring_utils.update_obsv_monitoring()
+            logger.info("Updating observational trigger emails...")
+            update_emails.update_obsv_trigger_emails()
+            logger.info("Updating observational info emails...")
+            update_emails.update_obsv_info_emails()
+
+    blob.log_client_stats()
+    blob_cache.log_blob_cache_stats()
     logger.info("Done.")
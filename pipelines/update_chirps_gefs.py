@@ -1,7 +1,10 @@
 from src.datasources.chirps_gefs import (
+    append_chirps_gefs_zarr,
     download_recent_chirps_gefs,
+    process_chirps_gefs_rolling_max,
     process_recent_chirps_gefs,
 )
+from src.utils import blob, blob_cache
 from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -14,3 +17,12 @@ if __name__ == "__main__":
 
     logger.info("Processing recent CHIRPS-GEFS data...")
     process_recent_chirps_gefs()
+
+    logger.info("Precomputing CHIRPS-GEFS rolling-max rasters...")
+    process_chirps_gefs_rolling_max()
+
+    logger.info("Appending to the CHIRPS-GEFS Zarr cube...")
+    append_chirps_gefs_zarr()
+
+    blob.log_client_stats()
+    blob_cache.log_blob_cache_stats()
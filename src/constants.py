@@ -15,6 +15,10 @@ IKE_ATCF_ID = "al092008"
 # attribution used when calibrating the rainfall thresholds).
 D_THRESH = 230
 
+# percentiles reported (with the mean and max) in the department-level
+# (adm1) rainfall series
+ADM1_RAIN_PERCENTILES = [50, 90]
+
 CERF_SIDS = [
     "2016273N13300",  # Matthew
     "2008245N17323",  # Ike
@@ -90,6 +94,11 @@ TRIGGERS = {
     "obsv": {"rain_mm": 57, "lt_max_hrs": None, "rp_years": 3.4},
 }
 OVERALL_RP_YEARS = 2.4
+# raster.zonal_mean method of the national rainfall series the rain_mm
+# thresholds are compared against (CHIRPS-GEFS mean dailies, IMERG
+# means): the all_touched mean they were calibrated on. Switching to
+# "coverage" means reprocessing both series and recalibrating TRIGGERS.
+TRIGGER_MEAN_METHOD = "all_touched"
 
 # French display names for the trigger stages.
 STAGE_NAMES_FR = {
@@ -10,6 +10,7 @@ import xarray as xr
 from tqdm import tqdm
 
 from src.datasources import codab
+from src.utils import raster
 
 DATA_DIR = Path(os.environ["AA_DATA_DIR_NEW"])
 CHIRPS_RAW_DIR = DATA_DIR / "public" / "raw" / "hti" / "chirps" / "daily"
@@ -31,11 +32,15 @@ def calculate_raster_stats():
     """
     ds = load_chirps_daily()
     adm = codab.load_codab_from_blob()
-    ds_clip = ds.rio.clip(adm.geometry, all_touched=True)
-    stats = ds_clip.mean(dim=["X", "Y"]).rename({"prcp": "mean"})
+    weights = raster.coverage_weights(
+        ds["prcp"], adm.geometry, x_dim="X", y_dim="Y"
+    )
+    # pixels outside Haiti have weight 0, so drop out of the quantiles too
+    weighted = ds.weighted(weights)
+    stats = weighted.mean(dim=["X", "Y"]).rename({"prcp": "mean"})
 
     for q in range(10, 91, 10):
-        stats[f"q{q}"] = ds_clip["prcp"].quantile(q / 100, dim=["X", "Y"])
+        stats[f"q{q}"] = weighted.quantile(q / 100, dim=["X", "Y"])["prcp"]
     stats = stats.drop_vars("quantile")
     df = stats.to_dataframe().drop(columns=["spatial_ref"]).reset_index()
     df["T"] = df["T"].dt.date
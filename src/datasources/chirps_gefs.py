@@ -1,16 +1,29 @@
 import datetime
+import os
+import re
 import sys
 import tempfile
 from io import BytesIO
+from typing import Literal
 
+import numpy as np
 import pandas as pd
 import rioxarray as rxr
 import xarray as xr
 from azure.core.exceptions import ResourceNotFoundError
+from rasterio.errors import RasterioIOError
 from tqdm import tqdm
 
+from src.constants import ADM1_RAIN_PERCENTILES, TRIGGER_MEAN_METHOD
 from src.datasources import codab
-from src.utils import blob
+from src.utils import (
+    backfill,
+    blob,
+    blob_async,
+    blob_manifest,
+    raster,
+    zarr_store,
+)
 from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -30,6 +43,107 @@ CHIRPS3_GEFS_URL = (
 )
 CHIRPS3_START = pd.Timestamp("2026-07-01")
 CHIRPS_GEFS_BLOB_DIR = "raw/chirps/gefs/hti"
+# one 16-band COG per issue date (band i = leadtime i - 1), consolidated
+# from the single-leadtime tifs above once all 16 are stored
+CHIRPS_GEFS_ISSUE_BLOB_DIR = "raw/chirps/gefs/hti_issue"
+# Mean-daily parquets are written sorted by issue date, in row groups of
+# ~two months of issue dates, so the issue_date min/max statistics let
+# filtered reads skip every row group outside the requested window.
+MEAN_DAILY_ROW_GROUP_SIZE = 16 * 64
+CHIRPS_GEFS_BLOB_RE = re.compile(
+    re.escape(f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_BLOB_DIR}/")
+    + r"chirps-gefs-hti_issued-(\d{4}-\d{2}-\d{2})"
+    r"_valid-(\d{4}-\d{2}-\d{2})\.tif"
+)
+CHIRPS_GEFS_ISSUE_BLOB_RE = re.compile(
+    re.escape(f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_ISSUE_BLOB_DIR}/")
+    + r"chirps-gefs-hti_issued-(\d{4}-\d{2}-\d{2})\.tif"
+)
+N_LEADTIMES = 16
+# issue dates stacked per round of concurrent leadtime loads
+CONSOLIDATE_BATCH_SIZE = 32
+# Haiti-window cube of every stored forecast (issue_date x leadtime x y x
+# x), for multi-year analysis without reopening the tifs; an fsspec path
+# (<container>/<blob name>)
+CHIRPS_GEFS_ZARR_ROOT = (
+    f"projects/{blob.PROJECT_PREFIX}/processed/chirps/gefs/"
+    "hti_chirps_gefs.zarr"
+)
+# a Zarr chunk holds this many issue dates x all leadtimes x the whole
+# (~60 x 40 pixel) window: ~5 MB uncompressed, so a map is one chunk read
+# and a 24-year pixel time series ~270
+ZARR_ISSUE_DATE_CHUNK = 32
+ZARR_CHUNKS = {"issue_date": ZARR_ISSUE_DATE_CHUNK, "leadtime": N_LEADTIMES}
+# (issue_date, valid_date, source_etag, method) of each cell processed
+# into the since-2024 mean-daily parquet, for incremental updates
+RECENT_MEAN_DAILY_INDEX_BLOB = (
+    f"{blob.PROJECT_PREFIX}/processed/chirps/gefs/hti/"
+    "hti_chirps_gefs_mean_daily_since2024_index.parquet"
+)
+# department-level (adm1) daily statistics, long format, next to the
+# national mean-daily parquets
+ADM1_DAILY_BLOB = (
+    f"{blob.PROJECT_PREFIX}/processed/chirps/gefs/hti/"
+    "hti_chirps_gefs_adm1_daily_{period}.parquet"
+)
+ADM1_DAILY_COLS = ["issue_date", "valid_date", "ADM1_PCODE", "stat", "value"]
+# issue dates reduced per vectorised pass when computing mean dailies:
+# a (64 x 16 x ~40 x 60) float32 stack is ~10 MB
+MEAN_DAILY_BATCH_SIZE = 64
+# per-pixel max 2-day rolling sum within each horizon, one small COG per
+# issue date and horizon, for the email rain maps
+ROLLING_MAX_BLOB_DIR = "processed/chirps/gefs/hti_rolling_max"
+ROLLING_MAX_BLOB_RE = re.compile(
+    re.escape(f"{blob.PROJECT_PREFIX}/{ROLLING_MAX_BLOB_DIR}/")
+    + r"chirps-gefs-hti_roll2max-(\d+)h_issued-(\d{4}-\d{2}-\d{2})\.tif"
+)
+ROLLING_MAX_HOURS = [72, 120]
+# host serving the CHC tifs, for backfill's per-host rate limit
+CHC_HOST = "data.chc.ucsb.edu"
+# downloads save the blob manifest every this many files, so an
+# interrupted backfill loses little of its index
+MANIFEST_SAVE_EVERY = 500
+
+
+def _parse_chirps_gefs_blob_name(blob_name: str) -> dict | None:
+    match = CHIRPS_GEFS_BLOB_RE.fullmatch(blob_name)
+    if match is None:
+        return None
+    return {
+        "issue_date": pd.Timestamp(match.group(1)),
+        "valid_date": pd.Timestamp(match.group(2)),
+    }
+
+
+def load_chirps_gefs_manifest(
+    refresh: bool = False,
+) -> blob_manifest.BlobManifest:
+    """Index of the raw CHIRPS-GEFS tifs, keyed by (issue_date,
+    valid_date)."""
+    return blob_manifest.BlobManifest(
+        f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_BLOB_DIR}",
+        key_parser=_parse_chirps_gefs_blob_name,
+        key_cols=["issue_date", "valid_date"],
+    ).load(refresh=refresh)
+
+
+def _parse_chirps_gefs_issue_blob_name(blob_name: str) -> dict | None:
+    match = CHIRPS_GEFS_ISSUE_BLOB_RE.fullmatch(blob_name)
+    if match is None:
+        return None
+    return {"issue_date": pd.Timestamp(match.group(1))}
+
+
+def load_chirps_gefs_issue_manifest(
+    refresh: bool = False,
+) -> blob_manifest.BlobManifest:
+    """Index of the per-issue-date CHIRPS-GEFS stacks, keyed by
+    issue_date."""
+    return blob_manifest.BlobManifest(
+        f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_ISSUE_BLOB_DIR}",
+        key_parser=_parse_chirps_gefs_issue_blob_name,
+        key_cols=["issue_date"],
+    ).load(refresh=refresh)
 
 
 def download_recent_chirps_gefs():
@@ -43,44 +157,30 @@ def download_recent_chirps_gefs():
         freq="D",
     )
 
-    existing_files = blob.list_container_blobs(
-        name_starts_with=f"{blob.PROJECT_PREFIX}/"
-        f"{CHIRPS_GEFS_BLOB_DIR}/"
-        f"chirps-gefs-hti_issued-{current_year}"
-    )
-
-    existing_issue_dates = [
-        pd.Timestamp(f.split("issued-")[1].split("_valid-")[0])
-        for f in existing_files
-    ]
-    logger.info(
-        f"Found {len(existing_issue_dates)} existing files for {current_year}"
-    )
-    download_dates = [
-        d for d in issue_date_range if d not in existing_issue_dates
+    manifest = load_chirps_gefs_manifest()
+    # per (issue date, leadtime), so that an issue date with only some of
+    # its leadtimes stored gets the rest; no journal, since leadtimes not
+    # yet published would be journaled as missing and never retried
+    incomplete = [
+        d
+        for d in issue_date_range
+        if not all(
+            manifest.has_key(d, d + pd.Timedelta(days=leadtime))
+            for leadtime in range(N_LEADTIMES)
+        )
     ]
     logger.info(
-        f"Downloading {len(download_dates)} new issue dates for {current_year}: {[str(x.date()) for x in download_dates]}"  # noqa: E501
+        f"{len(incomplete)} issue dates for {current_year} missing "
+        f"leadtimes: {[str(x.date()) for x in incomplete]}"
     )
+    download_chirps_gefs_issue_dates(issue_date_range, total_bounds, manifest)
 
-    for issue_date in tqdm(
-        download_dates,
-        disable=not sys.stdout.isatty(),
-    ):
-        for leadtime in range(16):
-            valid_date = issue_date + pd.Timedelta(days=leadtime)
-            download_chirps_gefs(
-                issue_date,
-                valid_date,
-                total_bounds,
-                existing_files,
-                clobber=False,
-            )
 
+def download_all_chirps_gefs(workers: int = backfill.DEFAULT_WORKERS):
+    """Download all CHIRPS GEFS, 2000-2023.
 
-def download_all_chirps_gefs():
-    """Download all CHIRPS GEFS
-    Takes around 40 hours
+    Resumable: progress is journaled locally (backfill.journal_path), so
+    rerunning after a crash or kill picks up where it stopped.
     """
     adm0 = codab.load_codab_from_blob(admin_level=0)
     total_bounds = adm0.total_bounds
@@ -88,30 +188,46 @@ def download_all_chirps_gefs():
     end_date = "2023-12-31"
 
     issue_date_range = pd.date_range(start=start_date, end=end_date, freq="D")
-    existing_files = blob.list_container_blobs(
-        name_starts_with=CHIRPS_GEFS_BLOB_DIR
+    manifest = load_chirps_gefs_manifest()
+    download_chirps_gefs_issue_dates(
+        issue_date_range,
+        total_bounds,
+        manifest,
+        journal=backfill.journal_path("chirps_gefs_2000_2023"),
+        workers=workers,
     )
-    for issue_date in tqdm(issue_date_range):
-        for leadtime in range(16):
-            valid_date = issue_date + pd.Timedelta(days=leadtime)
-            download_chirps_gefs(
-                issue_date,
-                valid_date,
-                total_bounds,
-                existing_files,
-                clobber=False,
-            )
 
 
-def download_chirps_gefs(
+def chirps_gefs_blob_name(
+    issue_date: pd.Timestamp, valid_date: pd.Timestamp
+) -> str:
+    return (
+        f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_BLOB_DIR}/chirps-gefs-hti_"
+        f"issued-{issue_date.date()}_valid-{valid_date.date()}.tif"
+    )
+
+
+def chirps_gefs_issue_blob_name(issue_date: pd.Timestamp) -> str:
+    return (
+        f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_ISSUE_BLOB_DIR}/"
+        f"chirps-gefs-hti_issued-{issue_date.date()}.tif"
+    )
+
+
+def fetch_chirps_gefs(
     issue_date: pd.Timestamp,
     valid_date: pd.Timestamp,
     total_bounds,
-    existing_files,
-    clobber: bool = False,
-    verbose: bool = False,
-):
-    """Download CHIRPS GEFS data for a specific issue and valid date."""
+    windowed: bool = True,
+) -> bytes:
+    """Fetch one CHC CHIRPS-GEFS tif, clipped to total_bounds, as COG
+    bytes.
+
+    windowed=True reads just the Haiti window with tuned GDAL range
+    reads (raster.read_remote_window); windowed=False is the previous
+    default-GDAL path, kept for comparison (see
+    exploration/chirps_gefs_windowed_reads.md).
+    """
     url_template = (
         CHIRPS3_GEFS_URL if issue_date >= CHIRPS3_START else CHIRPS_GEFS_URL
     )
@@ -123,13 +239,182 @@ def download_chirps_gefs(
         valid_month=valid_date.month,
         valid_day=valid_date.day,
     )
-    output_filename = (
-        f"chirps-gefs-hti_issued-"
-        f"{issue_date.date()}_valid-{valid_date.date()}.tif"
+    if windowed:
+        da_aoi = raster.read_remote_window(url, total_bounds)
+    else:
+        with rxr.open_rasterio(url) as da:
+            da_aoi = da.rio.clip_box(*total_bounds).load()
+    return _to_cog_bytes(da_aoi)
+
+
+def _to_cog_bytes(da: xr.DataArray) -> bytes:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_filename = os.path.join(temp_dir, "chirps_gefs.tif")
+        da.rio.to_raster(temp_filename, driver="COG")
+        with open(temp_filename, "rb") as f:
+            return f.read()
+
+
+def _backfill_chirps_gefs_file(
+    issue_date: pd.Timestamp, valid_date: pd.Timestamp, total_bounds
+) -> dict:
+    # runs in a backfill worker process
+    blob_name = chirps_gefs_blob_name(issue_date, valid_date)
+    data = fetch_chirps_gefs(issue_date, valid_date, total_bounds)
+    result = blob.upload_blob_data(blob_name, data)
+    return {"blob_name": blob_name, "size": len(data), "etag": result["etag"]}
+
+
+def _is_missing_chirps_gefs(error: Exception) -> bool:
+    """CHC has no file for this date (not published, or a gap in the
+    archive), so retrying won't help."""
+    return isinstance(error, RasterioIOError) and "404" in str(error)
+
+
+def download_chirps_gefs_issue_dates(
+    issue_dates,
+    total_bounds,
+    manifest: blob_manifest.BlobManifest,
+    journal=None,
+    workers: int = backfill.DEFAULT_WORKERS,
+    clobber: bool = False,
+) -> backfill.BackfillResult:
+    """Download all 16 leadtimes for each issue date, skipping those
+    already in the manifest, with backfill.run_backfill. Uploads are
+    recorded in the manifest, which is saved every MANIFEST_SAVE_EVERY
+    files and at the end.
+
+    Runs in worker processes: GDAL holds the GIL while opening the
+    remote tifs, so threads wouldn't overlap the fetches.
+    """
+    tasks = []
+    for issue_date in issue_dates:
+        for leadtime in range(16):
+            valid_date = issue_date + pd.Timedelta(days=leadtime)
+            if manifest.has_key(issue_date, valid_date) and not clobber:
+                continue
+            tasks.append(
+                backfill.BackfillTask(
+                    key=f"{issue_date.date()}_{valid_date.date()}",
+                    func=_backfill_chirps_gefs_file,
+                    args=(issue_date, valid_date, total_bounds),
+                    host=CHC_HOST,
+                )
+            )
+    logger.info(f"{len(tasks)} CHIRPS-GEFS files to download")
+    n_recorded = 0
+
+    def record(task, result):
+        nonlocal n_recorded
+        manifest.record(result["blob_name"], result["size"], result["etag"])
+        n_recorded += 1
+        if n_recorded % MANIFEST_SAVE_EVERY == 0:
+            manifest.save()
+
+    try:
+        result = backfill.run_backfill(
+            tasks,
+            journal=journal,
+            workers=workers,
+            processes=True,
+            initializer=blob.reset_client_pool,
+            is_missing=_is_missing_chirps_gefs,
+            on_done=record,
+        )
+    finally:
+        manifest.save()
+    consolidate_chirps_gefs_issue_dates(issue_dates, manifest, clobber=clobber)
+    return result
+
+
+def _stack_to_cog(da: xr.DataArray) -> bytes:
+    """COG bytes of a (valid_date, y, x) stack, one band per valid date,
+    with the valid dates as band descriptions."""
+    long_name = tuple(str(x.date()) for x in pd.DatetimeIndex(da.valid_date))
+    da = da.rename(valid_date="band").assign_coords(
+        band=range(1, da.sizes["valid_date"] + 1)
     )
-    output_path = (
-        f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_BLOB_DIR}/{output_filename}"
+    da.attrs["long_name"] = long_name
+    return _to_cog_bytes(da)
+
+
+def consolidate_chirps_gefs_issue_dates(
+    issue_dates,
+    manifest: blob_manifest.BlobManifest | None = None,
+    clobber: bool = False,
+) -> int:
+    """Write the 16-band stack for each issue date whose 16 leadtime tifs
+    are all stored and that has no stack yet. Also migrates issue dates
+    downloaded before stacks existed. Returns the number written."""
+    if manifest is None:
+        manifest = load_chirps_gefs_manifest()
+    issue_manifest = load_chirps_gefs_issue_manifest()
+    todo = [
+        issue_date
+        for issue_date in issue_dates
+        if (clobber or not issue_manifest.has_key(issue_date))
+        and all(
+            manifest.has_key(
+                issue_date, issue_date + pd.Timedelta(days=leadtime)
+            )
+            for leadtime in range(N_LEADTIMES)
+        )
+    ]
+    n_written = 0
+    while todo:
+        batch = todo[:CONSOLIDATE_BATCH_SIZE]
+        todo = todo[CONSOLIDATE_BATCH_SIZE:]
+        das = _load_chirps_gefs_leadtime_rasters(batch)
+        items = [
+            (chirps_gefs_issue_blob_name(issue_date), _stack_to_cog(da))
+            for issue_date, da in das.items()
+            if da is not None and da.sizes["valid_date"] == N_LEADTIMES
+        ]
+        for transfer in blob_async.upload_many(items):
+            if transfer.ok:
+                issue_manifest.record(
+                    transfer.blob_name, transfer.size, transfer.etag
+                )
+                n_written += 1
+            else:
+                logger.warning(
+                    f"Failed to upload {transfer.blob_name}: "
+                    f"{transfer.error}"
+                )
+        issue_manifest.save()
+    if n_written:
+        logger.info(f"Wrote {n_written} CHIRPS-GEFS issue-date stacks")
+    return n_written
+
+
+def download_chirps_gefs_issue_date(
+    issue_date: pd.Timestamp,
+    total_bounds,
+    manifest: blob_manifest.BlobManifest,
+    clobber: bool = False,
+):
+    """Download all 16 leadtimes for an issue date, skipping those already
+    in the manifest."""
+    return download_chirps_gefs_issue_dates(
+        [issue_date], total_bounds, manifest, clobber=clobber
     )
+
+
+def download_chirps_gefs(
+    issue_date: pd.Timestamp,
+    valid_date: pd.Timestamp,
+    total_bounds,
+    existing_files,
+    clobber: bool = False,
+    verbose: bool = False,
+    manifest: blob_manifest.BlobManifest | None = None,
+):
+    """Download CHIRPS GEFS data for a specific issue and valid date.
+
+    The upload is recorded in manifest if given (the caller saves it);
+    otherwise the manifest only picks it up on its next rebuild.
+    """
+    output_path = chirps_gefs_blob_name(issue_date, valid_date)
     if output_path in existing_files and not clobber:
         if verbose:
             print(
@@ -138,15 +423,10 @@ def download_chirps_gefs(
             )
         return
     try:
-        with rxr.open_rasterio(url) as da:
-            da_aoi = da.rio.clip_box(*total_bounds)
-            with tempfile.NamedTemporaryFile(
-                delete=False, suffix=".tif"
-            ) as tmpfile:
-                temp_filename = tmpfile.name
-                da_aoi.rio.to_raster(temp_filename, driver="COG")
-                with open(temp_filename, "rb") as f:
-                    blob.upload_blob_data(output_path, f)
+        data = fetch_chirps_gefs(issue_date, valid_date, total_bounds)
+        result = blob.upload_blob_data(output_path, data)
+        if manifest is not None:
+            manifest.record(output_path, len(data), result["etag"])
     except Exception as e:
         logger.warning(
             f"Failed to download or process CHIRPS GEFS data for "
@@ -158,20 +438,344 @@ def download_chirps_gefs(
 def load_chirps_gefs_raster(
     issue_date: pd.Timestamp, valid_date: pd.Timestamp
 ):
-    """Load CHIRPS GEFS raster data for a specific issue and valid date."""
-    filename = (
-        f"chirps-gefs-hti_"
-        f"issued-{issue_date.date()}_valid-{valid_date.date()}.tif"
-    )
-    data = blob.load_blob_data(
-        f"{blob.PROJECT_PREFIX}/{CHIRPS_GEFS_BLOB_DIR}/{filename}"
+    """Load CHIRPS GEFS raster data for a specific issue and valid date.
+
+    Opened by URL, so GDAL reads the COG with range requests as needed
+    rather than from a downloaded copy.
+    """
+    da = rxr.open_rasterio(
+        blob.get_blob_url(chirps_gefs_blob_name(issue_date, valid_date))
     )
-    blob_data = BytesIO(data)
-    da = rxr.open_rasterio(blob_data)
+    return da.squeeze(drop=True)
+
+
+def open_chirps_gefs_raster(data: bytes):
+    da = rxr.open_rasterio(BytesIO(data))
     da = da.squeeze(drop=True)
     return da
 
 
+def _load_chirps_gefs_leadtime_rasters(
+    issue_dates, verbose: bool = False
+) -> dict:
+    """{issue_date: (valid_date, y, x) stack, or None} from the
+    single-leadtime tifs, loading all blobs concurrently; leadtimes not
+    (yet) stored are skipped."""
+    keys = [
+        (issue_date, issue_date + pd.Timedelta(days=leadtime))
+        for issue_date in issue_dates
+        for leadtime in range(N_LEADTIMES)
+    ]
+    transfers = blob_async.load_many(
+        [chirps_gefs_blob_name(*key) for key in keys]
+    )
+    das = {issue_date: [] for issue_date in issue_dates}
+    for (issue_date, valid_date), transfer in zip(keys, transfers):
+        if transfer.not_found:
+            if verbose:
+                print(f"{transfer.error} for {issue_date} {valid_date}")
+            continue
+        if not transfer.ok:
+            raise transfer.error
+        da_in = open_chirps_gefs_raster(transfer.data)
+        da_in["valid_date"] = valid_date
+        das[issue_date].append(da_in)
+    return {
+        issue_date: xr.concat(das_i, dim="valid_date") if das_i else None
+        for issue_date, das_i in das.items()
+    }
+
+
+def _open_chirps_gefs_issue_stack(
+    data: bytes, issue_date: pd.Timestamp
+) -> xr.DataArray:
+    da = rxr.open_rasterio(BytesIO(data))
+    da = da.rename(band="valid_date").assign_coords(
+        valid_date=pd.date_range(issue_date, periods=da.sizes["band"])
+    )
+    # band descriptions only describe the file they were read from
+    da.attrs.pop("long_name", None)
+    return da
+
+
+def load_chirps_gefs_issues(
+    issue_dates, verbose: bool = False, leadtime_dates=()
+) -> dict:
+    """{issue_date: (valid_date, y, x) forecast, or None if nothing is
+    stored}, one blob per issue date where the 16-band stack exists,
+    falling back to the single-leadtime tifs (e.g. for an issue date
+    that isn't complete yet). Issue dates in leadtime_dates are always
+    read from the leadtime tifs, e.g. where one changed since the stack
+    was written."""
+    issue_dates = list(issue_dates)
+    leadtime_dates = set(leadtime_dates)
+    legacy_dates = [d for d in issue_dates if d in leadtime_dates]
+    stack_dates = [d for d in issue_dates if d not in leadtime_dates]
+    transfers = blob_async.load_many(
+        [chirps_gefs_issue_blob_name(d) for d in stack_dates]
+    )
+    das = {}
+    for issue_date, transfer in zip(stack_dates, transfers):
+        if transfer.not_found:
+            legacy_dates.append(issue_date)
+            continue
+        if not transfer.ok:
+            raise transfer.error
+        das[issue_date] = _open_chirps_gefs_issue_stack(
+            transfer.data, issue_date
+        )
+    if legacy_dates:
+        das.update(_load_chirps_gefs_leadtime_rasters(legacy_dates, verbose))
+    return {issue_date: das[issue_date] for issue_date in issue_dates}
+
+
+def load_chirps_gefs_issue(issue_date: pd.Timestamp) -> xr.DataArray | None:
+    """All stored leadtimes of one issue date, as (valid_date, y, x)."""
+    return load_chirps_gefs_issues([issue_date])[issue_date]
+
+
+def _issues_to_dataset(das: dict) -> xr.Dataset:
+    """(issue_date, leadtime, y, x) Dataset from {issue_date: (valid_date,
+    y, x)} arrays, leadtimes missing from an issue date filled with
+    NaN."""
+    das_out = []
+    for issue_date, da in das.items():
+        if da.rio.nodata is not None:
+            da = da.where(da != da.rio.nodata)
+        leadtimes = (pd.DatetimeIndex(da["valid_date"]) - issue_date).days
+        da = (
+            da.assign_coords(leadtime=("valid_date", leadtimes))
+            .swap_dims(valid_date="leadtime")
+            .drop_vars(["valid_date", "spatial_ref"], errors="ignore")
+            .reindex(leadtime=range(N_LEADTIMES))
+            .expand_dims(issue_date=[issue_date])
+        )
+        das_out.append(da.astype("float32"))
+    da = xr.concat(das_out, dim="issue_date")
+    da.attrs = {}
+    ds = da.to_dataset(name="precip")
+    ds.attrs["crs"] = "EPSG:4326"
+    return ds
+
+
+def _on_grid(das: dict, x, y) -> dict:
+    """das with their x/y set to the cube's grid (x, y), raising if an
+    issue date is on another grid: xr.concat would otherwise outer-join
+    them, padding with NaN. The CHIRPS2 and CHIRPS3 grids may differ, so
+    the cube may not span CHIRPS3_START."""
+    out = {}
+    for issue_date, da in das.items():
+        for dim, ref in [("x", x), ("y", y)]:
+            if da.sizes[dim] != len(ref) or not np.allclose(
+                da[dim].values, ref
+            ):
+                raise ValueError(
+                    f"CHIRPS-GEFS grid of {issue_date.date()} differs along "
+                    f"{dim} from the cube's; rebuild it over one datastream "
+                    f"(before or from {CHIRPS3_START.date()})"
+                )
+        out[issue_date] = da.assign_coords(x=x, y=y)
+    return out
+
+
+def load_chirps_gefs_zarr() -> xr.Dataset:
+    """The lazy (dask-backed) Haiti CHIRPS-GEFS cube, with valid_date as
+    an (issue_date, leadtime) coordinate."""
+    fs = blob.get_fs()
+    ds = xr.open_zarr(fs.get_mapper(CHIRPS_GEFS_ZARR_ROOT), consolidated=True)
+    ds = ds.assign_coords(
+        valid_date=ds["issue_date"]
+        + xr.DataArray(
+            ds["leadtime"].values.astype("timedelta64[D]"), dims="leadtime"
+        )
+    )
+    return ds.rio.write_crs(ds.attrs["crs"])
+
+
+def build_chirps_gefs_zarr(
+    start_date: str = "2000-01-01", end_date: str | None = None
+):
+    """(Re)write the cube from every issue date stored between start_date
+    and end_date (default: today), a chunk of issue dates at a time.
+    Raises ValueError if the range takes in issue dates on different
+    grids (see _on_grid)."""
+    fs = blob.get_fs()
+    mapper = fs.get_mapper(CHIRPS_GEFS_ZARR_ROOT)
+    if end_date is None:
+        end_date = datetime.date.today()
+    manifest = load_chirps_gefs_manifest()
+    stored = sorted({issue_date for issue_date, _ in manifest.keys()})
+    issue_dates = [
+        d
+        for d in stored
+        if pd.Timestamp(start_date) <= d <= pd.Timestamp(end_date)
+    ]
+    progress = tqdm(total=len(issue_dates), disable=not sys.stdout.isatty())
+    # (x, y) of the first issue date written
+    grid = []
+
+    def load_batch(batch):
+        progress.update(len(batch))
+        das = {
+            issue_date: da
+            for issue_date, da in load_chirps_gefs_issues(batch).items()
+            if da is not None
+        }
+        if not das:
+            return None
+        if not grid:
+            first = next(iter(das.values()))
+            grid.extend([first["x"].values, first["y"].values])
+        das = _on_grid(das, *grid)
+        return _issues_to_dataset(das).chunk(ZARR_CHUNKS)
+
+    zarr_store.write_zarr_batches(
+        mapper, issue_dates, load_batch, "issue_date", ZARR_ISSUE_DATE_CHUNK
+    )
+
+
+def append_chirps_gefs_zarr() -> int:
+    """Append complete issue dates (those with a 16-band stack) newer
+    than the cube's last issue date. Returns the number appended.
+
+    Zarr appends only at the end of issue_date, so an issue date that
+    completes after a newer one was appended needs a rebuild
+    (build_chirps_gefs_zarr) to be included.
+    """
+    fs = blob.get_fs()
+    mapper = fs.get_mapper(CHIRPS_GEFS_ZARR_ROOT)
+    try:
+        existing = xr.open_zarr(mapper, consolidated=True)
+    except (FileNotFoundError, KeyError):
+        logger.warning(
+            f"No CHIRPS-GEFS cube at {CHIRPS_GEFS_ZARR_ROOT}; run "
+            "build_chirps_gefs_zarr first."
+        )
+        return 0
+    last_issue_date = pd.Timestamp(existing["issue_date"].values[-1])
+    issue_manifest = load_chirps_gefs_issue_manifest()
+    new_dates = sorted(
+        issue_date
+        for (issue_date,) in issue_manifest.keys()
+        if issue_date > last_issue_date
+    )
+    if not new_dates:
+        logger.info("CHIRPS-GEFS cube is up to date")
+        return 0
+
+    def load_batch(batch):
+        das = _on_grid(
+            load_chirps_gefs_issues(batch),
+            existing["x"].values,
+            existing["y"].values,
+        )
+        return _issues_to_dataset(das).chunk(ZARR_CHUNKS)
+
+    zarr_store.write_zarr_batches(
+        mapper,
+        new_dates,
+        load_batch,
+        "issue_date",
+        ZARR_ISSUE_DATE_CHUNK,
+        n_existing=existing.sizes["issue_date"],
+    )
+    logger.info(
+        f"Appended {len(new_dates)} issue dates to the CHIRPS-GEFS cube: "
+        f"{[str(x.date()) for x in new_dates]}"
+    )
+    return len(new_dates)
+
+
+def _mean_daily_batches(issue_dates) -> list[list[pd.Timestamp]]:
+    """Issue dates in batches of MEAN_DAILY_BATCH_SIZE, never mixing the
+    CHIRPS2 and CHIRPS3 datastreams (whose grids may differ)."""
+    batches = []
+    for stream_dates in [
+        [d for d in issue_dates if d < CHIRPS3_START],
+        [d for d in issue_dates if d >= CHIRPS3_START],
+    ]:
+        while stream_dates:
+            batches.append(stream_dates[:MEAN_DAILY_BATCH_SIZE])
+            stream_dates = stream_dates[MEAN_DAILY_BATCH_SIZE:]
+    return batches
+
+
+def calculate_chirps_gefs_stats(
+    issue_dates, adm0, adm1=None, verbose: bool = False, leadtime_dates=()
+) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+    """Forecast rainfall statistics for each issue date x valid date:
+    the national mean over adm0 (columns valid_date, mean, issue_date)
+    and, if adm1 is given, each department's mean, max and
+    ADM1_RAIN_PERCENTILES in long format (columns issue_date,
+    valid_date, ADM1_PCODE, stat, value).
+
+    Each batch of issue dates is loaded as one (issue_date, leadtime, y,
+    x) stack and reduced in a single weighted pass for each output, so
+    memory is bounded by MEAN_DAILY_BATCH_SIZE and the work scales with
+    the array size, not the number of issue dates. leadtime_dates are
+    passed on to load_chirps_gefs_issues.
+    """
+    batches = _mean_daily_batches(sorted(issue_dates))
+    dfs, dfs_adm1 = [], []
+    for batch in tqdm(batches, disable=not sys.stdout.isatty()):
+        das = load_chirps_gefs_issues(batch, verbose, leadtime_dates)
+        missing = [d for d, da in das.items() if da is None]
+        if missing:
+            logger.warning(
+                f"No files found for issue dates "
+                f"{[str(d.date()) for d in missing]}, skipping."
+            )
+        das = {d: da for d, da in das.items() if da is not None}
+        if not das:
+            continue
+        ds = _issues_to_dataset(das)
+        da = ds["precip"].rio.write_crs(ds.attrs["crs"])
+        df_in = (
+            raster.zonal_mean(da, adm0.geometry, method=TRIGGER_MEAN_METHOD)
+            .to_dataframe(name="mean")["mean"]
+            .dropna()
+            .reset_index()
+        )
+        df_in["valid_date"] = df_in["issue_date"] + pd.to_timedelta(
+            df_in["leadtime"], unit="D"
+        )
+        dfs.append(df_in[["valid_date", "mean", "issue_date"]])
+        if adm1 is not None:
+            df_adm1 = raster.zonal_stats_long(
+                raster.zonal_stats(
+                    da,
+                    adm1,
+                    "ADM1_PCODE",
+                    percentiles=ADM1_RAIN_PERCENTILES,
+                ),
+                "ADM1_PCODE",
+            ).dropna(subset=["value"])
+            df_adm1["valid_date"] = df_adm1["issue_date"] + pd.to_timedelta(
+                df_adm1["leadtime"], unit="D"
+            )
+            dfs_adm1.append(df_adm1[ADM1_DAILY_COLS])
+    df = (
+        pd.concat(dfs, ignore_index=True)
+        if dfs
+        else pd.DataFrame(columns=["valid_date", "mean", "issue_date"])
+    )
+    if adm1 is None:
+        return df, None
+    df_adm1 = (
+        pd.concat(dfs_adm1, ignore_index=True)
+        if dfs_adm1
+        else pd.DataFrame(columns=ADM1_DAILY_COLS)
+    )
+    return df, df_adm1
+
+
+def calculate_chirps_gefs_mean_daily(
+    issue_dates, adm0, verbose: bool = False
+) -> pd.DataFrame:
+    """Just the national means of calculate_chirps_gefs_stats."""
+    return calculate_chirps_gefs_stats(issue_dates, adm0, verbose=verbose)[0]
+
+
 def process_chirps_gefs(verbose: bool = False):
     """Calculate spatial mean from all historical CHIRPS-GEFS forecasts
     for Haiti.
@@ -181,43 +785,53 @@ def process_chirps_gefs(verbose: bool = False):
     end_date = "2023-12-31"
 
     issue_date_range = pd.date_range(start=start_date, end=end_date, freq="D")
-
-    dfs = []
-    for issue_date in tqdm(issue_date_range):
-        das_i = []
-        for leadtime in range(16):
-            valid_date = issue_date + pd.Timedelta(days=leadtime)
-            try:
-                da_in = load_chirps_gefs_raster(issue_date, valid_date)
-                da_in["valid_date"] = valid_date
-                das_i.append(da_in)
-            except ResourceNotFoundError as e:
-                if verbose:
-                    print(f"{e} for {issue_date} {valid_date}")
-
-        if das_i:
-            da_i = xr.concat(das_i, dim="valid_date")
-            da_i_clip = da_i.rio.clip(adm0.geometry, all_touched=True)
-            df_in = (
-                da_i_clip.mean(dim=["x", "y"])
-                .to_dataframe(name="mean")["mean"]
-                .reset_index()
-            )
-            df_in["issue_date"] = issue_date
-            dfs.append(df_in)
-        else:
-            if verbose:
-                print(f"no files for issue_date {issue_date}")
-
-    df = pd.concat(dfs, ignore_index=True)
-    data = df.to_parquet()
+    df, df_adm1 = calculate_chirps_gefs_stats(
+        issue_date_range,
+        adm0,
+        codab.load_codab_from_blob(admin_level=1),
+        verbose,
+    )
+    data = df.to_parquet(row_group_size=MEAN_DAILY_ROW_GROUP_SIZE)
     blob_proc_dir = "processed/chirps/gefs/hti/"
     blob_name = "hti_chirps_gefs_mean_daily_2000_2023.parquet"
     blob.upload_blob_data(blob_proc_dir + blob_name, data)
+    blob.upload_parquet_to_blob(
+        ADM1_DAILY_BLOB.format(period="2000_2023"), df_adm1, index=False
+    )
+
+
+def _load_recent_mean_daily_index(existing_df) -> pd.DataFrame:
+    """The completeness index: (issue_date, valid_date, source_etag,
+    method) of every cell in the since-2024 parquet, source_etag being
+    the ETag of the leadtime tif it was computed from and method the
+    TRIGGER_MEAN_METHOD it was computed with. Bootstrapped from the
+    parquet if it doesn't exist yet, with no ETag or method: the tif
+    and method those cells came from are unknown, so they are all
+    recomputed once."""
+    try:
+        df_index = blob.load_parquet_from_blob(
+            RECENT_MEAN_DAILY_INDEX_BLOB, cache=False
+        )
+    except ResourceNotFoundError:
+        logger.info("No completeness index; bootstrapping from the parquet")
+        df_index = existing_df[["issue_date", "valid_date"]].copy()
+        df_index["source_etag"] = None
+    if "method" not in df_index.columns:
+        # written before methods were recorded
+        df_index["method"] = None
+    return df_index
+
 
+def process_recent_chirps_gefs(verbose: bool = False) -> dict:
+    """Process since-2024 CHIRPS-GEFS forecasts for Haiti, incrementally.
 
-def process_recent_chirps_gefs(verbose: bool = False):
-    """Process only 2024 CHIRPS-GEFS forecasts for Haiti."""
+    Only the (issue_date, valid_date) cells that are stored but not yet
+    processed, or whose tif or TRIGGER_MEAN_METHOD changed since
+    (stale), are recomputed and upserted; the completeness index next to
+    the parquet records the source ETag and method of each processed
+    cell. Returns (and logs) the number of cells filled, stale and still
+    missing.
+    """
     try:
         existing_df = load_recent_chirps_gefs_mean_daily()
     except ResourceNotFoundError:
@@ -227,77 +841,295 @@ def process_recent_chirps_gefs(verbose: bool = False):
         existing_df = pd.DataFrame(
             columns=["issue_date", "valid_date", "mean"]
         )
+    try:
+        existing_adm1 = load_chirps_gefs_adm1_daily()
+    except ResourceNotFoundError:
+        existing_adm1 = pd.DataFrame(columns=ADM1_DAILY_COLS)
     adm0 = codab.load_codab_from_blob(admin_level=0)
+    adm1 = codab.load_codab_from_blob(admin_level=1)
+    manifest = load_chirps_gefs_manifest()
+    df_index = _load_recent_mean_daily_index(existing_df)
+    # cell -> (ETag, method) it was computed from and with
+    processed = {
+        (issue_date, valid_date): (etag, method)
+        for issue_date, valid_date, etag, method in df_index[
+            ["issue_date", "valid_date", "source_etag", "method"]
+        ].itertuples(index=False)
+    }
+
     issue_date_range = pd.date_range(
         start="2024-01-01",
         end=datetime.date.today() + pd.DateOffset(days=1),
         freq="D",
     )
-    unprocessed_issue_date_range = [
-        d
-        for d in issue_date_range
-        if d not in existing_df["issue_date"].unique()
-    ]
+    # cell -> ETag of the tif it will be computed from
+    todo = {}
+    stale = set()
+    # issue dates with a leadtime tif replaced since it was processed
+    changed = set()
+    n_missing = 0
+    for issue_date in issue_date_range:
+        for leadtime in range(N_LEADTIMES):
+            cell = (issue_date, issue_date + pd.Timedelta(days=leadtime))
+            entry = manifest.get_by_key(*cell)
+            done = processed.get(cell)
+            if entry is None:
+                n_missing += 1
+            elif done is None:
+                todo[cell] = entry["etag"]
+            elif done != (entry["etag"], TRIGGER_MEAN_METHOD):
+                stale.add(cell)
+                todo[cell] = entry["etag"]
+                if done[0] != entry["etag"]:
+                    changed.add(issue_date)
+    # the department series also catches up on cells processed before it
+    # existed
+    adm1_cells = set(
+        zip(existing_adm1["issue_date"], existing_adm1["valid_date"])
+    )
+    adm1_todo = set(todo) | {
+        cell
+        for cell in processed
+        if cell not in adm1_cells and manifest.has_key(*cell)
+    }
+    todo_issue_dates = sorted({issue_date for issue_date, _ in adm1_todo})
     logger.info(
-        f"Processing {len(unprocessed_issue_date_range)} new issue dates "
-        "for recent CHIRPS-GEFS: "
-        f"{[str(x.date()) for x in unprocessed_issue_date_range]}"
-    )
-    dfs = []
-    for issue_date in tqdm(
-        unprocessed_issue_date_range, disable=not sys.stdout.isatty()
-    ):
-        if issue_date in existing_df["issue_date"].unique():
-            if verbose:
-                print(f"Skipping {issue_date}, already processed")
-            continue
-        das_i = []
-        for leadtime in range(16):
-            valid_date = issue_date + pd.Timedelta(days=leadtime)
-            try:
-                da_in = load_chirps_gefs_raster(issue_date, valid_date)
-                da_in["valid_date"] = valid_date
-                das_i.append(da_in)
-            except ResourceNotFoundError as e:
-                if verbose:
-                    print(f"{e} for {issue_date} {valid_date}")
-
-        if das_i:
-            logger.info(
-                f"Processing {len(das_i)} files for issue_date {issue_date}"
-            )
-            da_i = xr.concat(das_i, dim="valid_date")
-            da_i_clip = da_i.rio.clip(adm0.geometry, all_touched=True)
-            df_in = (
-                da_i_clip.mean(dim=["x", "y"])
-                .to_dataframe(name="mean")["mean"]
-                .reset_index()
-            )
-            df_in["issue_date"] = issue_date
-            dfs.append(df_in)
-        else:
-            logger.warning(
-                f"No files found for issue_date {issue_date.date()}, skipping."
-            )
+        f"Processing {len(todo)} cells ({len(stale)} stale) over "
+        f"{len(todo_issue_dates)} issue dates for recent CHIRPS-GEFS: "
+        f"{[str(x.date()) for x in todo_issue_dates]}"
+    )
+    # a tif replaced other than by download_chirps_gefs_issue_dates
+    # (which rebuilds its stack) leaves that stack out of date: rebuild
+    # it, but read the tifs regardless in case the upload failed
+    changed = sorted(changed)
+    if changed:
+        consolidate_chirps_gefs_issue_dates(changed, manifest, clobber=True)
+    df_new, df_adm1_new = calculate_chirps_gefs_stats(
+        todo_issue_dates, adm0, adm1, verbose, leadtime_dates=changed
+    )
+    # upsert just the todo cells
+    cells = list(zip(df_new["issue_date"], df_new["valid_date"]))
+    df_new = df_new[np.array([cell in todo for cell in cells], dtype=bool)]
+    new_cells = [cell for cell in cells if cell in todo]
+
+    def _cells_in(df, cells) -> np.ndarray:
+        return np.array(
+            [
+                cell in cells
+                for cell in zip(df["issue_date"], df["valid_date"])
+            ],
+            dtype=bool,
+        )
+
+    def _without_new_cells(df):
+        return df[~_cells_in(df, set(new_cells))]
+
+    df_adm1_new = df_adm1_new[_cells_in(df_adm1_new, adm1_todo)]
+    updated_adm1 = pd.concat(
+        [
+            df_adm1_new,
+            existing_adm1[~_cells_in(existing_adm1, set(adm1_todo))],
+        ],
+        ignore_index=True,
+    ).sort_values(["issue_date", "valid_date"], ignore_index=True)
+
+    updated_df = pd.concat(
+        [df_new, _without_new_cells(existing_df)], ignore_index=True
+    ).sort_values(["issue_date", "valid_date"], ignore_index=True)
+    df_index_new = df_new[["issue_date", "valid_date"]].copy()
+    df_index_new["source_etag"] = [todo[cell] for cell in new_cells]
+    df_index_new["method"] = TRIGGER_MEAN_METHOD
+    updated_index = pd.concat(
+        [df_index_new, _without_new_cells(df_index)], ignore_index=True
+    ).sort_values(["issue_date", "valid_date"], ignore_index=True)
 
-    updated_df = pd.concat(dfs + [existing_df], ignore_index=True)
     blob_name = (
         f"{blob.PROJECT_PREFIX}/processed/chirps/gefs/hti/"
         f"hti_chirps_gefs_mean_daily_since2024.parquet"
     )
-    blob.upload_parquet_to_blob(blob_name, updated_df)
+    blob.upload_parquet_to_blob(
+        blob_name,
+        updated_df,
+        skip_unchanged=True,
+        row_group_size=MEAN_DAILY_ROW_GROUP_SIZE,
+    )
+    blob.upload_parquet_to_blob(
+        ADM1_DAILY_BLOB.format(period="since2024"),
+        updated_adm1,
+        skip_unchanged=True,
+        index=False,
+    )
+    # written after the data: cells upserted but not indexed are just
+    # recomputed next run
+    blob.upload_parquet_to_blob(
+        RECENT_MEAN_DAILY_INDEX_BLOB,
+        updated_index,
+        skip_unchanged=True,
+        index=False,
+    )
+    n_refreshed = len(stale.intersection(new_cells))
+    stats = {
+        "filled": len(new_cells) - n_refreshed,
+        "stale": n_refreshed,
+        "missing": n_missing + len(todo) - len(new_cells),
+    }
+    logger.info(
+        f"Recent CHIRPS-GEFS mean daily: {stats['filled']} cells filled, "
+        f"{stats['stale']} stale cells refreshed, {stats['missing']} "
+        "cells still missing"
+    )
+    return stats
+
+
+def chirps_gefs_rolling_max_blob_name(
+    issue_date: pd.Timestamp, hours: int
+) -> str:
+    return (
+        f"{blob.PROJECT_PREFIX}/{ROLLING_MAX_BLOB_DIR}/"
+        f"chirps-gefs-hti_roll2max-{hours}h_issued-{issue_date.date()}.tif"
+    )
+
+
+def _parse_rolling_max_blob_name(blob_name: str) -> dict | None:
+    match = ROLLING_MAX_BLOB_RE.fullmatch(blob_name)
+    if match is None:
+        return None
+    return {
+        "issue_date": pd.Timestamp(match.group(2)),
+        "hours": int(match.group(1)),
+    }
+
+
+def load_rolling_max_manifest(
+    refresh: bool = False,
+) -> blob_manifest.BlobManifest:
+    return blob_manifest.BlobManifest(
+        f"{blob.PROJECT_PREFIX}/{ROLLING_MAX_BLOB_DIR}",
+        key_parser=_parse_rolling_max_blob_name,
+        key_cols=["issue_date", "hours"],
+    ).load(refresh=refresh)
+
+
+def calculate_rolling_max(
+    da: xr.DataArray, issue_date: pd.Timestamp, hours: int
+) -> xr.DataArray | None:
+    """Per-pixel max of the 2-day rolling sum over the valid dates within
+    hours of issue_date (e.g. 6 daily rasters, five windows, for 120 h),
+    from that issue date's (valid_date, y, x) forecast. None unless every
+    one of those valid dates is there."""
+    da_h = da.sel(
+        valid_date=slice(issue_date, issue_date + pd.Timedelta(hours=hours))
+    )
+    if da_h.sizes["valid_date"] != hours // 24 + 1:
+        return None
+    roll2 = da_h.rolling(valid_date=2).sum().max(dim="valid_date")
+    return roll2.rio.write_crs(da.rio.crs)
+
+
+def process_chirps_gefs_rolling_max(
+    issue_dates=None, clobber: bool = False
+) -> int:
+    """Store calculate_rolling_max for each of ROLLING_MAX_HOURS, for
+    every issue date (default: those of the current year) that has the
+    leadtimes for it and no stored raster yet. Returns the number
+    written."""
+    manifest = load_chirps_gefs_manifest()
+    rolling_manifest = load_rolling_max_manifest()
+    if issue_dates is None:
+        current_year = datetime.date.today().year
+        issue_dates = sorted(
+            {d for d, _ in manifest.keys() if d.year == current_year}
+        )
+    todo = {}
+    for issue_date in issue_dates:
+        for hours in ROLLING_MAX_HOURS:
+            if rolling_manifest.has_key(issue_date, hours) and not clobber:
+                continue
+            if all(
+                manifest.has_key(issue_date, issue_date + pd.Timedelta(days=i))
+                for i in range(hours // 24 + 1)
+            ):
+                todo.setdefault(issue_date, []).append(hours)
+    issue_dates = list(todo)
+    n_written = 0
+    while issue_dates:
+        batch = issue_dates[:CONSOLIDATE_BATCH_SIZE]
+        issue_dates = issue_dates[CONSOLIDATE_BATCH_SIZE:]
+        items = []
+        for issue_date, da in load_chirps_gefs_issues(batch).items():
+            for hours in todo[issue_date]:
+                roll2 = (
+                    None
+                    if da is None
+                    else calculate_rolling_max(da, issue_date, hours)
+                )
+                if roll2 is not None:
+                    items.append(
+                        (
+                            chirps_gefs_rolling_max_blob_name(
+                                issue_date, hours
+                            ),
+                            _to_cog_bytes(roll2),
+                        )
+                    )
+        for transfer in blob_async.upload_many(items):
+            if transfer.ok:
+                rolling_manifest.record(
+                    transfer.blob_name, transfer.size, transfer.etag
+                )
+                n_written += 1
+            else:
+                logger.warning(
+                    f"Failed to upload {transfer.blob_name}: "
+                    f"{transfer.error}"
+                )
+        rolling_manifest.save()
+    if n_written:
+        logger.info(f"Wrote {n_written} CHIRPS-GEFS rolling-max rasters")
+    return n_written
+
+
+def load_chirps_gefs_rolling_max(
+    issue_date: pd.Timestamp, hours: int = 120
+) -> xr.DataArray | None:
+    """The stored rolling-max raster for an issue date, or None if it
+    hasn't been computed (yet)."""
+    try:
+        data = blob.load_blob_data(
+            chirps_gefs_rolling_max_blob_name(issue_date, hours)
+        )
+    except ResourceNotFoundError:
+        return None
+    return open_chirps_gefs_raster(data)
 
 
-def load_recent_chirps_gefs_mean_daily():
+def load_recent_chirps_gefs_mean_daily(
+    columns: list[str] | None = None, filters: list | None = None
+):
+    """Load the since-2024 mean daily forecasts, optionally only some
+    columns / rows (e.g. filters=[("issue_date", ">=", date)])."""
     return blob.load_parquet_from_blob(
         f"{blob.PROJECT_PREFIX}/processed/chirps/gefs/hti/"
-        "hti_chirps_gefs_mean_daily_since2024.parquet"
+        "hti_chirps_gefs_mean_daily_since2024.parquet",
+        columns=columns,
+        filters=filters,
+    )
+
+
+def load_chirps_gefs_adm1_daily(
+    period: Literal["since2024", "2000_2023"] = "since2024",
+    filters: list | None = None,
+):
+    """Load the department-level (adm1) daily forecast statistics, in
+    long format (issue_date, valid_date, ADM1_PCODE, stat, value)."""
+    return blob.load_parquet_from_blob(
+        ADM1_DAILY_BLOB.format(period=period), filters=filters
     )
 
 
 def load_chirps_gefs_mean_daily():
-    data = blob.load_blob_data(
+    return blob.load_parquet_from_blob(
         f"{blob.PROJECT_PREFIX}/processed/chirps/gefs/hti/"
-        "hti_chirps_gefs_mean_daily_2000_2023.parquet"
+        "hti_chirps_gefs_mean_daily_2000_2023.parquet",
+        stream=True,
     )
-    return pd.read_parquet(BytesIO(data))
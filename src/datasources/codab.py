@@ -1,6 +1,27 @@
+import io
+import zipfile
+
 import requests
+import shapely
+from azure.core.exceptions import ResourceNotFoundError
+
+from src.utils import blob, run_cache
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
 
-from src.utils import blob
+CODAB_ZIP_BLOB = "ds-aa-hti-hurricanes/raw/codab/hti.shp.zip"
+# GeoParquet copies of each admin level (and of the buffers) load
+# straight from bytes; the shapefile zips are kept as a fallback.
+CODAB_GEOPARQUET_BLOB = (
+    "ds-aa-hti-hurricanes/processed/codab/hti_adm{admin_level}.parquet"
+)
+BUFFER_GEOPARQUET_BLOB = (
+    "ds-aa-hti-hurricanes/processed/codab/hti_buffer_{distance_km}km.parquet"
+)
+BUFFER_ZIP_BLOB = (
+    "ds-aa-hti-hurricanes/processed/codab/hti_buffer_{distance_km}km.shp.zip"
+)
 
 
 def process_buffer(distance_km: int = 230):
@@ -8,16 +29,24 @@ def process_buffer(distance_km: int = 230):
     buffer = adm0.to_crs(3857).buffer(distance=distance_km * 1000).to_crs(4326)
     blob.upload_gdf_to_blob(
         buffer,
-        f"ds-aa-hti-hurricanes/processed/codab/"
-        f"hti_buffer_{distance_km}km.shp.zip",
+        BUFFER_GEOPARQUET_BLOB.format(distance_km=distance_km),
         prod_dev="dev",
     )
 
 
 def load_buffer(distance_km: int = 230):
+    try:
+        return blob.load_gdf_from_blob(
+            BUFFER_GEOPARQUET_BLOB.format(distance_km=distance_km),
+            prod_dev="dev",
+        )
+    except ResourceNotFoundError:
+        logger.warning(
+            f"No GeoParquet buffer for {distance_km} km; "
+            "falling back to the shapefile zip."
+        )
     buffer = blob.load_gdf_from_blob(
-        f"ds-aa-hti-hurricanes/processed/codab/"
-        f"hti_buffer_{distance_km}km.shp.zip",
+        BUFFER_ZIP_BLOB.format(distance_km=distance_km),
         prod_dev="dev",
     )
     return buffer
@@ -28,15 +57,80 @@ def download_codab_to_blob():
     # Download data from URL
     response = requests.get(url)
     response.raise_for_status()
-    blob_name = "ds-aa-hti-hurricanes/raw/codab/hti.shp.zip"
-    blob.upload_blob_data(blob_name, response.content, prod_dev="dev")
+    blob.upload_blob_data(CODAB_ZIP_BLOB, response.content, prod_dev="dev")
+    migrate_codab_to_geoparquet()
+
+
+def migrate_codab_to_geoparquet():
+    """Write every admin level in the CODAB shapefile zip as GeoParquet.
+
+    Also converts any existing buffer shapefile zips."""
+    zip_data = blob.load_blob_data(CODAB_ZIP_BLOB, prod_dev="dev")
+    with zipfile.ZipFile(io.BytesIO(zip_data), "r") as zip_ref:
+        shapefiles = [f for f in zip_ref.namelist() if f.endswith(".shp")]
+    for shapefile in shapefiles:
+        admin_level = shapefile.removesuffix(".shp").split("_adm")[-1]
+        if not admin_level.isdigit():
+            continue
+        gdf = blob.load_gdf_from_blob(
+            CODAB_ZIP_BLOB, shapefile=shapefile, prod_dev="dev"
+        )
+        blob.upload_gdf_to_blob(
+            gdf,
+            CODAB_GEOPARQUET_BLOB.format(admin_level=admin_level),
+            prod_dev="dev",
+        )
+        logger.info(f"Wrote GeoParquet CODAB for admin level {admin_level}")
 
+    buffer_prefix = BUFFER_ZIP_BLOB.split("{")[0]
+    for blob_name in blob.list_container_blobs(name_starts_with=buffer_prefix):
+        if not blob_name.endswith(".shp.zip"):
+            continue
+        gdf = blob.load_gdf_from_blob(blob_name, prod_dev="dev")
+        blob.upload_gdf_to_blob(
+            gdf,
+            blob_name.removesuffix(".shp.zip") + ".parquet",
+            prod_dev="dev",
+        )
+        logger.info(f"Wrote GeoParquet copy of {blob_name}")
+    run_cache.invalidate()
 
+
+@run_cache.run_cached
 def load_codab_from_blob(admin_level: int = 0):
+    try:
+        return blob.load_gdf_from_blob(
+            CODAB_GEOPARQUET_BLOB.format(admin_level=admin_level),
+            prod_dev="dev",
+        )
+    except ResourceNotFoundError:
+        logger.warning(
+            f"No GeoParquet CODAB for admin level {admin_level}; "
+            "falling back to the shapefile zip."
+        )
     shapefile = f"hti_adm{admin_level}.shp"
     gdf = blob.load_gdf_from_blob(
-        "ds-aa-hti-hurricanes/raw/codab/hti.shp.zip",
+        CODAB_ZIP_BLOB,
         shapefile=shapefile,
         prod_dev="dev",
     )
     return gdf
+
+
+@run_cache.run_cached
+def load_codab_3857(admin_level: int = 0):
+    """load_codab_from_blob projected to EPSG:3857, for distances."""
+    return load_codab_from_blob(admin_level=admin_level).to_crs(3857)
+
+
+@run_cache.run_cached
+def load_codab_geometry(admin_level: int = 0, crs: int = 4326):
+    """All of an admin level's polygons as one prepared shapely
+    geometry, for repeated distance / intersection tests."""
+    if crs == 3857:
+        gdf = load_codab_3857(admin_level=admin_level)
+    else:
+        gdf = load_codab_from_blob(admin_level=admin_level).to_crs(crs)
+    geom = shapely.union_all(gdf.geometry)
+    shapely.prepare(geom)
+    return geom
@@ -1,62 +1,157 @@
 import datetime
+import json
 import os
 import platform
+import re
 import shutil
+import tempfile
+import threading
+import time
 from pathlib import Path
 from subprocess import Popen
 from typing import Literal
+from urllib.parse import urlparse
 
+import numpy as np
 import ocha_stratus as stratus
 import pandas as pd
 import requests
 import rioxarray as rxr
 import xarray as xr
+from azure.core.exceptions import ResourceNotFoundError
+from sqlalchemy import text
 
+from src.constants import ADM1_RAIN_PERCENTILES, TRIGGER_MEAN_METHOD
 from src.datasources import codab
-from src.utils import blob, raster
+from src.utils import backfill, blob, raster, zarr_store
+from src.utils.logging import get_logger
 
-IMERG_ZARR_ROOT = "az://global/imerg.zarr"
+logger = get_logger(__name__)
+
+# <container>/<path>, on blob.get_fs()
+IMERG_ZARR_ROOT = "global/imerg.zarr"
+# daily v7 late-run COGs, in the global container
+IMERG_COG_PREFIX = "imerg/v7/imerg-daily-late-"
+# Haiti-window cube of the daily COGs (date x y x), for long time series
+# without touching the global data; same fsspec path form as above
+IMERG_HTI_ZARR_ROOT = (
+    f"projects/{blob.PROJECT_PREFIX}/processed/imerg/hti_imerg.zarr"
+)
+# padding around the adm0 bounds, in degrees
+IMERG_HTI_WINDOW_BUFFER_DEG = 0.5
+# a chunk holds a year of the whole (~45 x 30 pixel) window: ~2 MB
+# uncompressed, so a multi-year daily series is a handful of chunk reads
+IMERG_HTI_ZARR_DATE_CHUNK = 366
+
+# department-level (adm1) daily statistics (mean, max, percentiles), long
+# format, next to the national v7 mean
+IMERG_ADM1_DAILY_BLOB = (
+    f"{blob.PROJECT_PREFIX}/processed/imerg/"
+    "hti_imerg_adm1_daily_v7_2024.parquet"
+)
+
+# start of the series used for monitoring (recent=True)
+IMERG_RECENT_START = pd.Timestamp("2024-06-01")
+# local snapshot of the recent Postgres series, for incremental fetches;
+# under the temp dir by default, since the repo may be a read-only mount
+IMERG_SNAPSHOT_PATH = Path(
+    os.getenv(
+        "DSCI_IMERG_SNAPSHOT",
+        os.path.join(tempfile.gettempdir(), "imerg_hti_recent.parquet"),
+    )
+)
+# incremental fetches re-read this many days before the high-water mark,
+# since the latest days can still be revised
+IMERG_SNAPSHOT_OVERLAP_DAYS = 3
+# the whole snapshot is refetched (picking up late revisions of older
+# days) once it's been this long since the last full fetch
+IMERG_SNAPSHOT_REVALIDATE_DAYS = 7
+
+# daily COGs opened (lazily) and reduced together by process_recent_imerg
+IMERG_BATCH_SIZE = 64
 
 IMERG_BASE_URL = (
     "https://gpm1.gesdisc.eosdis.nasa.gov/data/GPM_L3/GPM_3IMERGD"
     "{run}.0{version}/{date:%Y}/{date:%m}/3B-DAY-{run}.MS.MRG.3IMERG."
     "{date:%Y%m%d}-S000000-E235959.V0{version}{version_letter}.nc4"
 )
+# daily NetCDFs from download_imerg_range, one file per date
+IMERG_DOWNLOAD_DIR = Path("temp/imerg")
+IMERG_DOWNLOAD_WORKERS = 4
+IMERG_DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+IMERG_DOWNLOAD_TIMEOUT_S = 60
+
+_sessions = threading.local()
+
+
+def _imerg_mean(da: xr.DataArray, geometry) -> xr.DataArray:
+    """National mean of a (date, y, x) stack, by TRIGGER_MEAN_METHOD."""
+    if TRIGGER_MEAN_METHOD == "all_touched":
+        # as the series was calibrated: nearest-upsampled to 0.05 deg,
+        # then the mean of every pixel the geometry touches
+        da = raster.upsample_dataarray(
+            da, lat_dim="y", lon_dim="x", resolution=0.05
+        ).rio.write_crs(4326)
+    return raster.zonal_mean(da, geometry, method=TRIGGER_MEAN_METHOD)
 
 
 def process_recent_imerg(verbose: bool = False):
     adm0 = codab.load_codab_from_blob()
-    minx, miny, maxx, maxy = adm0.total_bounds
+    adm1 = codab.load_codab_from_blob(admin_level=1)
     blob_names = blob.list_container_blobs(
-        name_starts_with="imerg/v7/imerg-daily-late-2024",
+        name_starts_with=f"{IMERG_COG_PREFIX}2024",
         container_name="global",
     )
     df = load_imerg_mean(version=7, recent=True)
+    try:
+        df_adm1 = load_imerg_adm1_daily()
+    except ResourceNotFoundError:
+        df_adm1 = pd.DataFrame(columns=["date", "ADM1_PCODE", "stat", "value"])
+    done_dates = set(df["date"])
+    done_adm1_dates = set(df_adm1["date"])
 
-    dicts = []
+    todo = {}
     for blob_name in blob_names:
         date_in = pd.to_datetime(blob_name.split(".")[0][-10:])
-        if date_in in df["date"].unique():
+        if date_in in done_dates and date_in in done_adm1_dates:
             if verbose:
                 print(f"already calculated for {date_in}")
             continue
-        else:
-            print(f"calculating IMERG mean for {date_in}")
-        cog_url = (
-            f"https://{blob.DEV_BLOB_NAME}.blob.core.windows.net/global/"
-            f"{blob_name}?{blob.DEV_BLOB_SAS}"
-        )
-        da_in = rxr.open_rasterio(cog_url, masked=True, chunks=True)
-        da_in = da_in.squeeze(drop=True)
-        da_box = da_in.sel(x=slice(minx, maxx), y=slice(miny, maxy))
-        da_box_up = raster.upsample_dataarray(
-            da_box, lat_dim="y", lon_dim="x", resolution=0.05
-        )
-        da_box_up = da_box_up.rio.write_crs(4326)
-        da_clip = da_box_up.rio.clip(adm0.geometry, all_touched=True)
-        da_mean = da_clip.mean()
-        mean_val = float(da_mean.compute())
-        dicts.append({"date": date_in, "mean": mean_val})
+        todo[date_in] = blob_name
+
+    dicts = []
+    dfs_adm1 = []
+    dates = sorted(todo)
+    while dates:
+        batch = dates[:IMERG_BATCH_SIZE]
+        dates = dates[IMERG_BATCH_SIZE:]
+        print(f"calculating IMERG means for {batch[0]} to {batch[-1]}")
+        # one read of the Haiti window per day serves both the national
+        # mean and the department stats
+        da_box = open_imerg_window_stack(
+            [todo[d] for d in batch], batch, adm0.total_bounds
+        ).load()
+        new_dates = [d for d in batch if d not in done_dates]
+        if new_dates:
+            means = _imerg_mean(da_box.sel(date=new_dates), adm0.geometry)
+            dicts.extend(
+                {"date": d, "mean": float(v)}
+                for d, v in zip(new_dates, means.values)
+            )
+        new_adm1_dates = [d for d in batch if d not in done_adm1_dates]
+        if new_adm1_dates:
+            df_adm1_in = raster.zonal_stats_long(
+                raster.zonal_stats(
+                    da_box.sel(date=new_adm1_dates),
+                    adm1,
+                    "ADM1_PCODE",
+                    percentiles=ADM1_RAIN_PERCENTILES,
+                ),
+                "ADM1_PCODE",
+            )
+            dfs_adm1.append(
+                df_adm1_in[["date", "ADM1_PCODE", "stat", "value"]]
+            )
 
     df_new = pd.DataFrame(dicts)
     df_combined = pd.concat([df, df_new], ignore_index=True)
@@ -64,7 +159,150 @@ def process_recent_imerg(verbose: bool = False):
         f"{blob.PROJECT_PREFIX}/processed/imerg/"
         f"hti_imerg_daily_mean_v7_2024.parquet"
     )
-    blob.upload_parquet_to_blob(blob_name, df_combined)
+    blob.upload_parquet_to_blob(blob_name, df_combined, skip_unchanged=True)
+    df_adm1_combined = pd.concat([df_adm1] + dfs_adm1, ignore_index=True)
+    blob.upload_parquet_to_blob(
+        IMERG_ADM1_DAILY_BLOB,
+        df_adm1_combined,
+        skip_unchanged=True,
+        index=False,
+    )
+    append_imerg_hti_zarr()
+
+
+def open_imerg_window_stack(
+    blob_names: list[str], dates: list[pd.Timestamp], total_bounds
+) -> xr.DataArray:
+    """Lazy (date, y, x) stack of the total_bounds window of daily IMERG
+    COGs in the global container; loading it reads the windows in
+    parallel."""
+    das = []
+    for blob_name in blob_names:
+        cog_url = blob.get_blob_url(blob_name, container_name="global")
+        da_in = rxr.open_rasterio(cog_url, masked=True, chunks=True)
+        das.append(da_in.squeeze(drop=True).rio.clip_box(*total_bounds))
+    return xr.concat(das, dim=pd.Index(dates, name="date"), join="override")
+
+
+def load_imerg_adm1_daily():
+    """Department-level (adm1) daily IMERG statistics since 2024, in long
+    format (date, ADM1_PCODE, stat, value)."""
+    return blob.load_parquet_from_blob(IMERG_ADM1_DAILY_BLOB)
+
+
+def imerg_url(
+    date: pd.Timestamp,
+    run: Literal["E", "L"] = "L",
+    version: int = 7,
+    base_url: str = IMERG_BASE_URL,
+) -> str:
+    version_letter = "B" if version == 7 else ""
+    return base_url.format(
+        run=run, date=date, version=version, version_letter=version_letter
+    )
+
+
+def _get_session() -> requests.Session:
+    """This thread's session, reused across downloads for keep-alive
+    (and the Earthdata login cookies)."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        _sessions.session = session
+    return session
+
+
+def _download_imerg_file(url: str, save_path, resume: bool = True) -> dict:
+    """Stream url to save_path via save_path.part, resuming a .part left
+    by an earlier attempt with a Range request. A .part that doesn't
+    match the remote file's size is discarded and the file fetched anew.
+    """
+    save_path = Path(save_path)
+    part_path = save_path.with_name(save_path.name + ".part")
+    if part_path.exists() and not resume:
+        part_path.unlink()
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    size = 0
+    restart = False
+    with _get_session().get(
+        url, headers=headers, stream=True, timeout=IMERG_DOWNLOAD_TIMEOUT_S
+    ) as r:
+        if offset and r.status_code == 416:
+            # nothing left past the offset: the .part is complete only if
+            # it is exactly the remote size, e.g. not after a republish
+            total = re.fullmatch(
+                r"bytes \*/(\d+)", r.headers.get("Content-Range", "")
+            )
+            restart = total is None or int(total.group(1)) != offset
+        else:
+            r.raise_for_status()
+            # 200 rather than 206: the server ignored the Range
+            mode = "ab" if r.status_code == 206 else "wb"
+            with open(part_path, mode) as f:
+                for chunk in r.iter_content(IMERG_DOWNLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+                    size += len(chunk)
+    if restart:
+        logger.warning(
+            f"{part_path.name} ({offset} bytes) doesn't match the remote "
+            "file; downloading it again"
+        )
+        return _download_imerg_file(url, save_path, resume=False)
+    os.replace(part_path, save_path)
+    return {"path": str(save_path), "size": size}
+
+
+def _is_missing_imerg(e: Exception) -> bool:
+    return (
+        isinstance(e, requests.exceptions.HTTPError)
+        and e.response is not None
+        and e.response.status_code == 404
+    )
+
+
+def download_imerg_range(
+    start_date,
+    end_date,
+    run: Literal["E", "L"] = "L",
+    version: int = 7,
+    save_dir=IMERG_DOWNLOAD_DIR,
+    workers: int = IMERG_DOWNLOAD_WORKERS,
+    journal: str | None = None,
+    base_url: str = IMERG_BASE_URL,
+) -> dict:
+    """Download the daily IMERG NetCDFs from start_date to end_date into
+    save_dir, one file per date, workers at a time. Files already in
+    save_dir are skipped and partial ones resumed; with a journal name
+    a killed run picks up where it stopped. Returns {date: path} of the
+    files present."""
+    save_dir = Path(save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    tasks = []
+    for date in pd.date_range(start_date, end_date):
+        url = imerg_url(date, run=run, version=version, base_url=base_url)
+        save_path = save_dir / url.split("/")[-1]
+        paths[date] = save_path
+        if save_path.exists():
+            continue
+        tasks.append(
+            backfill.BackfillTask(
+                key=str(date.date()),
+                func=_download_imerg_file,
+                args=(url, save_path),
+                host=urlparse(url).hostname,
+            )
+        )
+    backfill.run_backfill(
+        tasks,
+        journal=(
+            backfill.journal_path(journal) if journal is not None else None
+        ),
+        workers=workers,
+        is_missing=_is_missing_imerg,
+    )
+    return {date: path for date, path in paths.items() if path.exists()}
 
 
 def download_imerg(
@@ -74,39 +312,99 @@ def download_imerg(
     save_path: str = Path("temp/imerg_temp.nc"),
     verbose: bool = False,
 ):
-    version_letter = "B" if version == 7 else ""
-    url = IMERG_BASE_URL.format(
-        run=run, date=date, version=version, version_letter=version_letter
-    )
+    url = imerg_url(date, run=run, version=version)
     if verbose:
         print("downloading from " + url)
-    result = requests.get(url)
     try:
-        result.raise_for_status()
-        if os.path.exists(save_path):
-            os.remove(save_path)
-        f = open(save_path, "wb")
-        f.write(result.content)
-        f.close()
+        # save_path is reused across dates, so never resume
+        _download_imerg_file(url, save_path, resume=False)
         if verbose:
-            print("contents of URL written to " + save_path)
+            print("contents of URL written to " + str(save_path))
     except requests.exceptions.HTTPError as err:
         print(err)
         print("failed to download from " + url)
 
 
-def load_imerg_from_postgres(recent: bool = False):
+def load_imerg_from_postgres(
+    recent: bool = False,
+    start_date: pd.Timestamp | None = None,
+    incremental: bool = False,
+):
+    """National IMERG daily means from Postgres, from start_date (or
+    IMERG_RECENT_START if recent) onwards, filtered in the query.
+
+    With incremental (recent series only), rows are kept in a local
+    snapshot at IMERG_SNAPSHOT_PATH and only those from a few days
+    before its last date are fetched, except for a full refetch every
+    IMERG_SNAPSHOT_REVALIDATE_DAYS."""
+    if recent and start_date is None:
+        start_date = IMERG_RECENT_START
+    if incremental:
+        return _load_imerg_snapshot(start_date or IMERG_RECENT_START)
+    return _query_imerg(start_date)
+
+
+def _query_imerg(start_date: pd.Timestamp | None = None) -> pd.DataFrame:
     query = """
     SELECT valid_date, mean
     FROM public.imerg
     WHERE pcode = 'HT'
     """
-    df = pd.read_sql(
-        query, stratus.get_engine(stage="prod"), parse_dates=["valid_date"]
+    params = {}
+    if start_date is not None:
+        query += " AND valid_date >= :start_date"
+        params["start_date"] = pd.Timestamp(start_date).date()
+    start = time.perf_counter()
+    with stratus.get_engine(stage="prod").connect() as conn:
+        df = pd.read_sql(
+            text(query), conn, params=params, parse_dates=["valid_date"]
+        )
+    logger.info(
+        f"Fetched {len(df)} IMERG rows from Postgres "
+        f"(valid_date >= {start_date}) in "
+        f"{time.perf_counter() - start:.2f}s"
     )
-    df = df.rename(columns={"valid_date": "date"})
-    if recent:
-        df = df[df["date"] >= "2024-06-01"]
+    return df.rename(columns={"valid_date": "date"})
+
+
+def _load_imerg_snapshot(start_date: pd.Timestamp) -> pd.DataFrame:
+    """Snapshot read or write failures (a missing, corrupt or unwritable
+    file) fall back to the SQL-filtered full fetch."""
+    meta_path = IMERG_SNAPSHOT_PATH.with_suffix(".json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        df = pd.read_parquet(IMERG_SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable IMERG snapshot: {e}")
+        meta, df = {}, None
+    now = pd.Timestamp.now(tz="UTC")
+    start_str = str(pd.Timestamp(start_date).date())
+    if (
+        df is None
+        or df.empty
+        or meta.get("start_date") != start_str
+        or "revalidated_at" not in meta
+        or now - pd.Timestamp(meta["revalidated_at"])
+        > pd.Timedelta(days=IMERG_SNAPSHOT_REVALIDATE_DAYS)
+    ):
+        df = _query_imerg(start_date)
+        meta = {"start_date": start_str, "revalidated_at": now.isoformat()}
+    else:
+        since = df["date"].max() - pd.Timedelta(
+            days=IMERG_SNAPSHOT_OVERLAP_DAYS
+        )
+        df_new = _query_imerg(since)
+        df = pd.concat([df[df["date"] < since], df_new], ignore_index=True)
+    df = df.sort_values("date", ignore_index=True)
+    try:
+        IMERG_SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(IMERG_SNAPSHOT_PATH, index=False)
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+    except OSError as e:
+        logger.warning(f"Could not write IMERG snapshot: {e}")
     return df
 
 
@@ -138,10 +436,7 @@ def open_imerg_raster(date: pd.Timestamp):
     blob_name = f"imerg/v07b/imerg-daily-late-{date.date()}.tif"
     # blob_client = blob.dev_glb_container_client.get_blob_client(blob_name)
     # session = AzureSession(blob_client)
-    cog_url = (
-        f"https://{blob.DEV_BLOB_NAME}.blob.core.windows.net/global/"
-        f"{blob_name}?{blob.DEV_BLOB_SAS}"
-    )
+    cog_url = blob.get_blob_url(blob_name, container_name="global")
     da_out = rxr.open_rasterio(
         cog_url, masked=True, chunks={"band": 1, "x": 3600, "y": 1800}
     )
@@ -150,6 +445,110 @@ def open_imerg_raster(date: pd.Timestamp):
     return da_out
 
 
+def _imerg_hti_window() -> list[float]:
+    minx, miny, maxx, maxy = codab.load_codab_from_blob().total_bounds
+    buffer = IMERG_HTI_WINDOW_BUFFER_DEG
+    return [minx - buffer, miny - buffer, maxx + buffer, maxy + buffer]
+
+
+def _list_imerg_cogs() -> dict:
+    """{date: blob name} of the daily COGs."""
+    return {
+        pd.Timestamp(blob_name.split(".")[0][-10:]): blob_name
+        for blob_name in blob.list_container_blobs(
+            name_starts_with=IMERG_COG_PREFIX, container_name="global"
+        )
+    }
+
+
+def _imerg_hti_dataset(cogs: dict, dates, window) -> xr.Dataset:
+    da = open_imerg_window_stack([cogs[d] for d in dates], dates, window)
+    da = da.drop_vars("spatial_ref", errors="ignore").astype("float32")
+    da.attrs = {}
+    ds = da.to_dataset(name="precip")
+    ds.attrs["crs"] = "EPSG:4326"
+    # kept so appends clip exactly the same pixels
+    ds.attrs["window"] = [float(v) for v in window]
+    return ds.chunk({"date": IMERG_HTI_ZARR_DATE_CHUNK})
+
+
+def load_imerg_hti_zarr() -> xr.Dataset:
+    """The lazy (dask-backed) Haiti-window IMERG cube."""
+    fs = blob.get_fs()
+    ds = xr.open_zarr(fs.get_mapper(IMERG_HTI_ZARR_ROOT), consolidated=True)
+    return ds.rio.write_crs(ds.attrs["crs"])
+
+
+def build_imerg_hti_zarr(
+    start_date: str = "2000-01-01", end_date: str | None = None
+):
+    """(Re)write the Haiti-window cube from every daily COG between
+    start_date and end_date (default: today), a chunk of dates at a
+    time."""
+    fs = blob.get_fs()
+    mapper = fs.get_mapper(IMERG_HTI_ZARR_ROOT)
+    if end_date is None:
+        end_date = datetime.date.today()
+    cogs = _list_imerg_cogs()
+    dates = [
+        d
+        for d in sorted(cogs)
+        if pd.Timestamp(start_date) <= d <= pd.Timestamp(end_date)
+    ]
+    window = _imerg_hti_window()
+
+    def load_batch(batch):
+        logger.info(f"Writing IMERG {batch[0].date()} to {batch[-1].date()}")
+        return _imerg_hti_dataset(cogs, batch, window)
+
+    zarr_store.write_zarr_batches(
+        mapper, dates, load_batch, "date", IMERG_HTI_ZARR_DATE_CHUNK
+    )
+
+
+def append_imerg_hti_zarr() -> int:
+    """Append the daily COGs newer than the cube's last date. Returns the
+    number of dates appended."""
+    fs = blob.get_fs()
+    mapper = fs.get_mapper(IMERG_HTI_ZARR_ROOT)
+    try:
+        existing = xr.open_zarr(mapper, consolidated=True)
+    except (FileNotFoundError, KeyError):
+        logger.warning(
+            f"No IMERG cube at {IMERG_HTI_ZARR_ROOT}; run "
+            "build_imerg_hti_zarr first."
+        )
+        return 0
+    last_date = pd.Timestamp(existing["date"].values[-1])
+    cogs = _list_imerg_cogs()
+    new_dates = sorted(d for d in cogs if d > last_date)
+    if not new_dates:
+        logger.info("IMERG cube is up to date")
+        return 0
+
+    def load_batch(batch):
+        ds = _imerg_hti_dataset(cogs, batch, existing.attrs["window"])
+        for dim in ["x", "y"]:
+            if ds.sizes[dim] != existing.sizes[dim] or not np.allclose(
+                ds[dim].values, existing[dim].values
+            ):
+                raise ValueError(
+                    f"IMERG grid changed along {dim}; rebuild the cube"
+                )
+        return ds.assign_coords(x=existing["x"].values, y=existing["y"].values)
+
+    zarr_store.write_zarr_batches(
+        mapper,
+        new_dates,
+        load_batch,
+        "date",
+        IMERG_HTI_ZARR_DATE_CHUNK,
+        n_existing=existing.sizes["date"],
+    )
+    logger.info(f"Appended {len(new_dates)} dates to the IMERG cube")
+    return len(new_dates)
+
+
 def append_imerg_zarr(da):
     fs = blob.get_fs()
     da.to_zarr(
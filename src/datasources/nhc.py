@@ -1,5 +1,6 @@
 import gzip
-from datetime import datetime
+import re
+from concurrent.futures import ThreadPoolExecutor
 from ftplib import FTP
 from io import BytesIO
 
@@ -9,7 +10,43 @@ from tqdm import tqdm
 
 from src.constants import D_THRESH
 from src.datasources import chirps_gefs, codab, ibtracs
-from src.utils import blob
+from src.utils import blob, blob_manifest
+
+# Raw a-deck CSVs streamed concurrently in process_historical_forecasts,
+# each parsed in chunks of ADECK_CSV_CHUNK_ROWS rows, so memory stays
+# bounded however large the files get.
+ADECK_LOAD_CONCURRENCY = 16
+ADECK_CSV_CHUNK_ROWS = 50_000
+ADECK_OFCL_COLS = [
+    "TECH",
+    "YYYYMMDDHH",
+    "TAU",
+    "LatN/S",
+    "LonE/W",
+    "MSLP",
+    "VMAX",
+]
+ADECK_BLOB_DIR = "raw/noaa/nhc/historical_forecasts"
+# <year or "recent">/<a-deck file stem>.csv
+ADECK_BLOB_RE = re.compile(
+    re.escape(f"{ADECK_BLOB_DIR}/") + r"(\d{4}|recent)/([^/]+)\.csv"
+)
+
+
+def _parse_adeck_blob_name(blob_name: str) -> dict | None:
+    match = ADECK_BLOB_RE.fullmatch(blob_name)
+    if match is None:
+        return None
+    return {"folder": match.group(1), "adeck": match.group(2)}
+
+
+def load_adeck_manifest(refresh: bool = False) -> blob_manifest.BlobManifest:
+    """Index of the raw a-deck CSVs, keyed by (folder, adeck file stem)."""
+    return blob_manifest.BlobManifest(
+        ADECK_BLOB_DIR,
+        key_parser=_parse_adeck_blob_name,
+        key_cols=["folder", "adeck"],
+    ).load(refresh=refresh)
 
 
 def calculate_hist_fcast_monitors(lt_cutoff_hrs: int = None):
@@ -127,7 +164,7 @@ def download_historical_forecasts(
     recent_directory = "/atcf/aid_public"
     archive_directory = "/atcf/archive"
 
-    existing_files = blob.list_container_blobs(name_starts_with="raw/noaa/nhc")
+    manifest = load_adeck_manifest()
     if include_archive:
         ftp.cwd(archive_directory)
         for year in tqdm(range(2000, 2023)):
@@ -141,10 +178,10 @@ def download_historical_forecasts(
             ]
             for filename in filenames:
                 out_blob = (
-                    f"raw/noaa/nhc/historical_forecasts/{year}/"
+                    f"{ADECK_BLOB_DIR}/{year}/"
                     f"{filename.removesuffix('.dat.gz')}.csv"
                 )
-                if out_blob in existing_files and not clobber:
+                if out_blob in manifest and not clobber:
                     continue
                 with BytesIO() as buffer:
                     ftp.retrbinary("RETR " + filename, buffer.write)
@@ -153,8 +190,10 @@ def download_historical_forecasts(
                         df = pd.read_csv(file, header=None, names=nhc_cols)
                 out_data = df.to_csv(index=False)
 
-                blob.upload_blob_data(out_blob, out_data)
+                result = blob.upload_blob_data(out_blob, out_data)
+                manifest.record(out_blob, len(out_data), result["etag"])
 
+            manifest.save()
             ftp.cwd("..")
         ftp.cwd("..")
 
@@ -167,10 +206,10 @@ def download_historical_forecasts(
         ]
         for filename in filenames:
             out_blob = (
-                f"raw/noaa/nhc/historical_forecasts/recent/"
+                f"{ADECK_BLOB_DIR}/recent/"
                 f"{filename.removesuffix('.dat.gz')}.csv"
             )
-            if out_blob in existing_files and not clobber:
+            if out_blob in manifest and not clobber:
                 continue
             with BytesIO() as buffer:
                 ftp.retrbinary("RETR " + filename, buffer.write)
@@ -179,63 +218,77 @@ def download_historical_forecasts(
                     df = pd.read_csv(file, header=None, names=nhc_cols)
             out_data = df.to_csv(index=False)
 
-            blob.upload_blob_data(out_blob, out_data)
+            result = blob.upload_blob_data(out_blob, out_data)
+            manifest.record(out_blob, len(out_data), result["etag"])
 
+        manifest.save()
         ftp.cwd("..")
 
 
-def process_historical_forecasts():
-    blob_names = blob.list_container_blobs(
-        name_starts_with="raw/noaa/nhc/historical_forecasts/"
+def _decode_latlon(latlon: pd.Series) -> pd.Series:
+    """ATCF tenths of a degree with a hemisphere suffix ("150N", "700W")
+    to signed degrees; NaN for an unknown hemisphere."""
+    latlon = latlon.astype(str).str.strip()
+    hemisphere = latlon.str[-1]
+    value = pd.to_numeric(latlon.str[:-1], errors="coerce") / 10
+    return value.where(hemisphere.isin(["N", "E"]), -value).where(
+        hemisphere.isin(["N", "E", "S", "W"])
     )
-    blob_names = [x for x in blob_names if x.endswith(".csv")]
 
-    def proc_latlon(latlon):
-        c = latlon[-1]
-        if c in ["N", "E"]:
-            return float(latlon[:-1]) / 10
-        elif c in ["S", "W"]:
-            return -float(latlon[:-1]) / 10
 
-    dfs = []
-    for blob_name in tqdm(blob_names):
-        df_in = pd.read_csv(BytesIO(blob.load_blob_data(blob_name)))
-        atcf_id = blob_name.removesuffix(".csv")[-8:]
+def _parse_adeck(dff: pd.DataFrame) -> pd.DataFrame:
+    """OFCL a-deck rows (YYYYMMDDHH, TAU, LatN/S, LonE/W, MSLP, VMAX) to
+    issue_time, valid_time, lat, lon, windspeed, pressure, with
+    whole-column operations only."""
+    issue_time = pd.to_datetime(
+        dff["YYYYMMDDHH"].astype(str), format="%Y%m%d%H"
+    )
+    return pd.DataFrame(
+        {
+            "issue_time": issue_time,
+            "valid_time": issue_time + pd.to_timedelta(dff["TAU"], unit="h"),
+            "lat": _decode_latlon(dff["LatN/S"]),
+            "lon": _decode_latlon(dff["LonE/W"]),
+            "windspeed": dff["VMAX"],
+            "pressure": dff["MSLP"],
+        }
+    )
 
+
+def process_historical_forecasts():
+    blob_names = sorted(load_adeck_manifest().names())
+
+    def load_ofcl_rows(blob_name: str) -> pd.DataFrame:
+        # only the needed columns, filtered chunk by chunk as the CSV
+        # streams in, so the raw a-deck is never in memory as a whole
         cols = ["YYYYMMDDHH", "TAU", "LatN/S", "LonE/W", "MSLP", "VMAX"]
-        dff = df_in[df_in["TECH"] == " OFCL"][cols]
-        if dff.empty:
-            continue
-
-        dff["issue_time"] = dff["YYYYMMDDHH"].apply(
-            lambda x: datetime.strptime(str(x), "%Y%m%d%H")
-        )
-        dff["valid_time"] = dff.apply(
-            lambda row: row["issue_time"] + pd.Timedelta(hours=row["TAU"]),
-            axis=1,
-        )
-
-        dff["lat"] = dff["LatN/S"].apply(proc_latlon)
-        dff["lon"] = dff["LonE/W"].apply(proc_latlon)
-        dff = dff.rename(
-            columns={
-                "TAU": "leadtime",
-                "MSLP": "pressure",
-                "VMAX": "windspeed",
-            }
-        )
-        cols = [
-            "issue_time",
-            "valid_time",
-            "lat",
-            "lon",
-            "windspeed",
-            "pressure",
-        ]
-        dff = dff[cols]
-        dff = dff.loc[~dff.duplicated()]
-        dff["atcf_id"] = atcf_id
-        dfs.append(dff)
+        with blob.open_blob(blob_name) as f:
+            return pd.concat(
+                [
+                    chunk.loc[chunk["TECH"] == " OFCL", cols]
+                    for chunk in pd.read_csv(
+                        f,
+                        usecols=ADECK_OFCL_COLS,
+                        chunksize=ADECK_CSV_CHUNK_ROWS,
+                    )
+                ],
+                ignore_index=True,
+            )
+
+    dfs = []
+    with ThreadPoolExecutor(max_workers=ADECK_LOAD_CONCURRENCY) as executor:
+        ofcl_rows = executor.map(load_ofcl_rows, blob_names)
+        for blob_name, dff in tqdm(
+            zip(blob_names, ofcl_rows), total=len(blob_names)
+        ):
+            atcf_id = blob_name.removesuffix(".csv")[-8:]
+            if dff.empty:
+                continue
+
+            dff = _parse_adeck(dff)
+            dff = dff.loc[~dff.duplicated()]
+            dff["atcf_id"] = atcf_id
+            dfs.append(dff)
 
     df = pd.concat(dfs, ignore_index=True)
     save_blob = "processed/noaa/nhc/historical_forecasts/al_2000_2023.csv"
@@ -243,13 +296,10 @@ def process_historical_forecasts():
 
 
 def load_processed_historical_forecasts():
-    return pd.read_csv(
-        BytesIO(
-            blob.load_blob_data(
-                f"{blob.PROJECT_PREFIX}/"
-                f"processed/noaa/nhc/historical_forecasts/al_2000_2023.csv"
-            )
-        ),
+    return blob.load_csv_from_blob(
+        f"{blob.PROJECT_PREFIX}/"
+        f"processed/noaa/nhc/historical_forecasts/al_2000_2023.csv",
+        stream=True,
         parse_dates=["issue_time", "valid_time"],
     )
 
@@ -278,14 +328,11 @@ def calculate_hti_distance():
 
 
 def load_hti_distances():
-    return pd.read_parquet(
-        BytesIO(
-            blob.load_blob_data(
-                f"{blob.PROJECT_PREFIX}/"
-                f"processed/noaa/nhc/historical_forecasts/"
-                "hti_distances_2000_2023.parquet"
-            )
-        )
+    return blob.load_parquet_from_blob(
+        f"{blob.PROJECT_PREFIX}/"
+        f"processed/noaa/nhc/historical_forecasts/"
+        "hti_distances_2000_2023.parquet",
+        stream=True,
     )
 
 
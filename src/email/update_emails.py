@@ -16,6 +16,7 @@ carries an activation banner, even if the latest advisory no longer
 meets the thresholds (or is past cutoff).
 """
 
+import io
 import traceback
 
 import pandas as pd
@@ -31,6 +32,8 @@ from src.utils.logging import get_logger
 logger = get_logger(__name__)
 
 EMAIL_RECORD_BLOB = f"{blob.PROJECT_PREFIX}/email/email_record_v2.csv"
+# Attempts at a conditional email record write before giving up.
+EMAIL_RECORD_SAVE_ATTEMPTS = 5
 
 WSP_UNAVAILABLE_HTML = (
     "<p style='color:#7e8e8f'>(Prévisions probabilistes WSP non "
@@ -39,15 +42,25 @@ WSP_UNAVAILABLE_HTML = (
 
 
 def load_email_record() -> pd.DataFrame:
+    """The email record, with the etag it was read at in attrs["etag"]
+    (for save_email_record)."""
     try:
-        return blob.load_csv_from_blob(EMAIL_RECORD_BLOB)
+        data, etag = blob.load_blob_data(
+            EMAIL_RECORD_BLOB, cache=False, return_etag=True
+        )
+        df = pd.read_csv(io.BytesIO(data))
     except Exception:
         logger.info("No existing v2 email record; starting fresh.")
-        return pd.DataFrame(columns=["monitor_id", "atcf_id", "email_type"])
+        df = pd.DataFrame(columns=["monitor_id", "atcf_id", "email_type"])
+        etag = blob.IF_MISSING
+    df.attrs["etag"] = etag
+    return df
 
 
-def save_email_record(df: pd.DataFrame):
-    blob.upload_csv_to_blob(EMAIL_RECORD_BLOB, df)
+def save_email_record(df: pd.DataFrame, if_match: str | None = None):
+    blob.upload_csv_to_blob(
+        EMAIL_RECORD_BLOB, df, skip_unchanged=True, if_match=if_match
+    )
 
 
 def _already_sent(record: pd.DataFrame, email_type: str, key: str, by: str):
@@ -120,7 +133,9 @@ def build_email_plots(
                 name,
                 issue_time,
             )
-            timing = _compute_timing(tracks_fcast, adm0.to_crs(3857))
+            timing = _compute_timing(
+                tracks_fcast, codab.load_codab_geometry(crs=3857)
+            )
             det_img += _timing_html(timing, issue_time)
             rain_img = build_rain_forecast_img(issue_time, name, adm0)
     except Exception as e:
@@ -133,13 +148,13 @@ def build_rain_forecast_img(issue_time, name: str, adm0) -> str | None:
     """Map of per-pixel max 2-day rolling CHIRPS-GEFS rainfall over the
     120 h horizon, from the issuance most recent before the advisory
     (the same issuance the trigger evaluation uses)."""
-    import xarray as xr
-
     from src.constants import FRENCH_MONTHS, TRIGGERS
     from src.datasources import chirps_gefs
     from src.monitoring import monitoring_utils
 
     try:
+        # same arguments as in update_fcast_monitoring, so that within a
+        # monitoring run this is a run-cache hit
         df_gefs = monitoring_utils.load_gefs_with_issue_times()
         t = storms_db.naive_utc(issue_time)
         issue_date = df_gefs[df_gefs["issue_time_approx"] < t][
@@ -147,16 +162,16 @@ def build_rain_forecast_img(issue_time, name: str, adm0) -> str | None:
         ].max()
         if pd.isnull(issue_date):
             return None
-        # 6 daily rasters cover the five 2-day windows within 120 h
-        das = []
-        for lead in range(6):
-            valid_date = issue_date + pd.Timedelta(days=lead)
-            das.append(
-                chirps_gefs.load_chirps_gefs_raster(issue_date, valid_date)
-            )
-        da = xr.concat(das, dim="leadtime")
-        roll2 = da.rolling(leadtime=2).sum().max(dim="leadtime")
-        roll2 = roll2.rio.write_crs(das[0].rio.crs)
+        # precomputed by the CHIRPS-GEFS update; computed here only if
+        # that hasn't run for this issue date yet
+        roll2 = chirps_gefs.load_chirps_gefs_rolling_max(issue_date, 120)
+        if roll2 is None:
+            da = chirps_gefs.load_chirps_gefs_issue(issue_date)
+            if da is None:
+                return None
+            roll2 = chirps_gefs.calculate_rolling_max(da, issue_date, 120)
+        if roll2 is None:
+            return None
 
         label = issue_date.strftime("%-d %b %Y")
         for en, fr in FRENCH_MONTHS.items():
@@ -175,7 +190,7 @@ def build_rain_forecast_img(issue_time, name: str, adm0) -> str | None:
         return None
 
 
-def _compute_timing(tracks_fcast, adm0_3857) -> dict:
+def _compute_timing(tracks_fcast, hti_geom_3857) -> dict:
     """Timing estimates from the deterministic forecast: closest-pass
     time and the earliest time each wind level could reach Haiti.
 
@@ -217,7 +232,7 @@ def _compute_timing(tracks_fcast, adm0_3857) -> dict:
         geometry=gpd.points_from_xy(df["lon"], df["lat"]),
         crs="EPSG:4326",
     ).to_crs(3857)
-    dist_km = pts.geometry.distance(adm0_3857.iloc[0].geometry) / 1000
+    dist_km = pts.geometry.distance(hti_geom_3857) / 1000
 
     timing = {}
     idx = dist_km.idxmin()
@@ -283,10 +298,11 @@ def _activated_stages(atcf_id: str, issue_time) -> list[str]:
         ("fcast", ("mobilisation", "action")),
         ("obsv", ("obsv",)),
     ):
-        df = monitoring_utils.load_existing_monitoring_points(fcast_obsv)
+        df = monitoring_utils.load_existing_monitoring_points(
+            fcast_obsv, filters=[("atcf_id", "==", atcf_id)]
+        )
         if df.empty:
             continue
-        df = df[df["atcf_id"] == atcf_id]
         df = df[df["issue_time"].apply(storms_db.naive_utc) <= t]
         for stage in stages:
             if bool(df[f"{stage}_trigger"].any()):
@@ -495,7 +511,26 @@ def _append_and_save(record: pd.DataFrame, new_records: list):
     if send.DRY_RUN:
         logger.info(f"DRY_RUN: not recording {len(new_records)} sent emails.")
         return
-    combined = pd.concat(
-        [record, pd.DataFrame(new_records)], ignore_index=True
+    # the emails are already sent, so keep trying to record them: on a
+    # conflict an overlapping run recorded emails since we loaded the
+    # record, so add ours to its version rather than overwriting it
+    for attempt in range(EMAIL_RECORD_SAVE_ATTEMPTS):
+        try:
+            save_email_record(
+                pd.concat(
+                    [record, pd.DataFrame(new_records)], ignore_index=True
+                ),
+                if_match=record.attrs.get("etag"),
+            )
+            return
+        except blob.UPLOAD_CONFLICT_ERRORS:
+            logger.warning(
+                f"Email record changed during this run (attempt "
+                f"{attempt + 1}); merging."
+            )
+            record = load_email_record()
+    logger.error(f"Could not record sent emails: {new_records}")
+    raise RuntimeError(
+        f"Could not update the email record after "
+        f"{EMAIL_RECORD_SAVE_ATTEMPTS} attempts."
     )
-    save_email_record(combined)
@@ -20,14 +20,15 @@ Faithfulness notes (deliberate, to match the storms.* tables):
 from functools import lru_cache
 
 import geopandas as gpd
-import ocha_stratus as stratus
 import pandas as pd
+import rioxarray as rxr
 import xarray as xr
 from ocha_lens.utils.storm import calculate_wind_buffers_gdf, expand_quad_col
 from sqlalchemy import text
 
 from src.constants import EXPOSURE_WIND_KT
 from src.datasources import storms_db
+from src.utils import blob
 from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -39,9 +40,7 @@ _ADM0_BLOB = "fieldmaps/edge-matched/humanitarian/intl/adm0/HTI.parquet"
 @lru_cache(maxsize=1)
 def load_hti_adm0() -> gpd.GeoDataFrame:
     """FieldMaps edge-matched HTI adm0 (same boundary as storms-pipeline)."""
-    gdf = stratus.load_geoparquet_from_blob(
-        _ADM0_BLOB, stage="dev", container_name="global"
-    )
+    gdf = blob.load_geoparquet_from_blob(_ADM0_BLOB, container_name="global")
     if len(gdf) > 1:
         gdf = gdf.dissolve()
     return gdf
@@ -50,9 +49,9 @@ def load_hti_adm0() -> gpd.GeoDataFrame:
 @lru_cache(maxsize=1)
 def load_pop_hti() -> xr.DataArray:
     """WorldPop 2026 1km clipped to the HTI adm0 window."""
-    da = stratus.open_blob_cog(_POP_BLOB, container_name="raster").squeeze(
-        drop=True
-    )
+    da = rxr.open_rasterio(
+        blob.get_blob_url(_POP_BLOB, container_name="raster")
+    ).squeeze(drop=True)
     hti_geom = load_hti_adm0().geometry.union_all()
     return da.rio.clip([hti_geom], all_touched=True)
 
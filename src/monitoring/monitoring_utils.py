@@ -20,19 +20,21 @@ is forecast) within D_THRESH (230 km) of Haiti — the same attribution
 used when calibrating the thresholds. This is a date-window rule, not
 a trigger gate: wind exposure is computed without any distance gate.
 
-Monitoring parquets are v2 (new schema); the v1 files are left intact
-for the historical record and the Dash app.
+Monitoring records are v2 (new schema), kept in an append-only
+partitioned store (src/monitoring/store.py); the v1 files are left
+intact for the historical record and the Dash app.
 """
 
 from typing import Literal
 
 import geopandas as gpd
 import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
 
 from src.constants import D_THRESH, LT_CUTOFF_HRS, TRIGGERS
 from src.datasources import chirps_gefs, codab, imerg, storms_db
-from src.monitoring import exposure
-from src.utils import blob
+from src.monitoring import exposure, store
+from src.utils import run_cache
 from src.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -71,15 +73,21 @@ def _should_skip_existing(
     return False
 
 
-def load_existing_monitoring_points(fcast_obsv: Literal["fcast", "obsv"]):
-    blob_name = (
-        f"{blob.PROJECT_PREFIX}/monitoring/"
-        f"hti_{fcast_obsv}_monitoring_v2.parquet"
-    )
+def load_existing_monitoring_points(
+    fcast_obsv: Literal["fcast", "obsv"],
+    columns: list[str] | None = None,
+    filters: list | None = None,
+):
+    """All v2 monitoring rows so far (see src/monitoring/store.py)."""
     try:
-        return blob.load_parquet_from_blob(blob_name)
-    except Exception:
-        logger.info(f"No existing v2 monitoring at {blob_name}; starting.")
+        return store.load_monitoring_points(
+            fcast_obsv, columns=columns, filters=filters
+        )
+    except ResourceNotFoundError:
+        logger.info(
+            f"No existing v2 {fcast_obsv} monitoring at "
+            f"{store.dataset_prefix(fcast_obsv)}; starting."
+        )
         return pd.DataFrame(columns=["monitor_id"])
 
 
@@ -210,8 +218,15 @@ def process_fcast_advisory(
     return row
 
 
-def load_gefs_with_issue_times() -> pd.DataFrame:
-    df_gefs_all = chirps_gefs.load_recent_chirps_gefs_mean_daily()
+@run_cache.run_cached
+def load_gefs_with_issue_times(
+    columns: list[str] | None = None, filters: list | None = None
+) -> pd.DataFrame:
+    """Recent CHIRPS-GEFS mean daily with the approximate issue time.
+    If columns are given they must include issue_date."""
+    df_gefs_all = chirps_gefs.load_recent_chirps_gefs_mean_daily(
+        columns=columns, filters=filters
+    )
     df_gefs_all["issue_time_approx"] = df_gefs_all[
         "issue_date"
     ] + pd.Timedelta(hours=8, minutes=50)
@@ -219,7 +234,7 @@ def load_gefs_with_issue_times() -> pd.DataFrame:
 
 
 def update_fcast_monitoring(clobber: bool = False):
-    adm0 = codab.load_codab_from_blob().to_crs(3857)
+    adm0 = codab.load_codab_3857()
     logger.info("Loading recent CHIRPS-GEFS data for Haiti.")
     df_gefs_all = load_gefs_with_issue_times()
     logger.info("Loading existing monitoring points.")
@@ -250,27 +265,16 @@ def update_fcast_monitoring(clobber: bool = False):
     else:
         logger.info(f"Found {len(df_new_monitoring)} new forecast points.")
     if clobber:
-        df_monitoring_combined = df_new_monitoring
+        if not df_new_monitoring.empty:
+            store.replace_monitoring_points("fcast", df_new_monitoring)
     else:
-        df_monitoring_combined = pd.concat(
-            [df_existing_monitoring, df_new_monitoring]
-        )
-
-    if df_monitoring_combined.empty:
-        return
-    df_monitoring_combined = df_monitoring_combined.sort_values(
-        ["issue_time", "atcf_id"]
-    )
-    blob_name = (
-        f"{blob.PROJECT_PREFIX}/monitoring/hti_fcast_monitoring_v2.parquet"
-    )
-    blob.upload_parquet_to_blob(blob_name, df_monitoring_combined, index=False)
+        store.append_monitoring_points("fcast", df_new_monitoring)
 
 
 def update_obsv_monitoring(clobber: bool = False):
-    adm0 = codab.load_codab_from_blob().to_crs(3857)
+    adm0 = codab.load_codab_3857()
     logger.info("Loading recent IMERG data for Haiti.")
-    obsv_rain = imerg.load_imerg_from_postgres(recent=True)
+    obsv_rain = imerg.load_imerg_from_postgres(recent=True, incremental=True)
     obsv_rain["roll2_sum"] = (
         obsv_rain["mean"].rolling(window=2, center=True, min_periods=1).sum()
     )
@@ -366,14 +370,7 @@ def update_obsv_monitoring(clobber: bool = False):
             f"Found {len(df_new_monitoring)} new observational points."
         )
     if clobber:
-        df_monitoring_combined = df_new_monitoring
+        if not df_new_monitoring.empty:
+            store.replace_monitoring_points("obsv", df_new_monitoring)
     else:
-        df_monitoring_combined = pd.concat(
-            [df_existing_monitoring, df_new_monitoring]
-        )
-    if df_monitoring_combined.empty:
-        return
-    blob_name = (
-        f"{blob.PROJECT_PREFIX}/monitoring/hti_obsv_monitoring_v2.parquet"
-    )
-    blob.upload_parquet_to_blob(blob_name, df_monitoring_combined, index=False)
+        store.append_monitoring_points("obsv", df_new_monitoring)
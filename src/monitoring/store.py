@@ -0,0 +1,400 @@
+"""Append-only, partitioned store for the v2 monitoring records.
+
+Layout, per monitoring side, under
+monitoring/hti_{fcast_obsv}_monitoring_v2/:
+
+    season=2026/atcf_id=al132026/part-20260901T035012-1a2b3c4d.parquet
+    _manifest.json
+
+Each run writes its new rows as new part files (one per season x storm)
+and lists them in the manifest; nothing already stored is rewritten, so
+a run costs the new rows rather than the whole season. Readers only
+trust the manifest: a part written by a run that crashed before
+updating it is ignored. Partitions with many parts are compacted into
+one.
+
+Parts dropped from the manifest (by compaction or a clobber) are listed
+under "superseded" rather than deleted straight away, since a reader
+may still be loading them from the manifest it read before; they are
+deleted by a compaction once SUPERSEDED_GRACE has passed.
+
+The manifest is written with If-Match on the etag it was read at, so
+two overlapping runs can't drop each other's parts: the one that loses
+the race re-reads the manifest and re-applies its change.
+
+Until the first append, readers fall back to the legacy single
+hti_{fcast_obsv}_monitoring_v2.parquet, which the first append migrates
+(and leaves in place).
+"""
+
+import json
+import uuid
+from typing import Literal
+
+import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
+
+from src.utils import blob
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "_manifest.json"
+# Attempts at a conditional manifest write before giving up.
+MANIFEST_SAVE_ATTEMPTS = 5
+# Compact a partition once it has this many part files.
+COMPACT_AFTER_PARTS = 24
+# How long superseded parts are kept for readers of an older manifest.
+SUPERSEDED_GRACE = pd.Timedelta(hours=6)
+# UTC, for the manifest's created / superseded times (sorts as text).
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+# Part files are written sorted, in small row groups (see
+# blob.load_parquet_from_blob for the filter pushdown this enables).
+PART_ROW_GROUP_SIZE = 256
+SORT_COLS = {
+    "fcast": ["issue_time", "atcf_id"],
+    "obsv": ["atcf_id", "issue_time"],
+}
+
+
+def dataset_prefix(fcast_obsv: Literal["fcast", "obsv"]) -> str:
+    return f"{blob.PROJECT_PREFIX}/monitoring/hti_{fcast_obsv}_monitoring_v2"
+
+
+def legacy_blob_name(fcast_obsv: Literal["fcast", "obsv"]) -> str:
+    return f"{dataset_prefix(fcast_obsv)}.parquet"
+
+
+def load_manifest(fcast_obsv: Literal["fcast", "obsv"]) -> dict | None:
+    """The dataset manifest, or None if nothing has been appended yet."""
+    return _load_manifest_with_etag(fcast_obsv)[0]
+
+
+def _load_manifest_with_etag(
+    fcast_obsv: Literal["fcast", "obsv"],
+) -> tuple[dict | None, str]:
+    """(manifest, etag), with etag IF_MISSING when there's no manifest
+    yet, to pass to save_manifest."""
+    try:
+        data, etag = blob.load_blob_data(
+            f"{dataset_prefix(fcast_obsv)}/{MANIFEST_NAME}",
+            cache=False,
+            return_etag=True,
+        )
+    except ResourceNotFoundError:
+        return None, blob.IF_MISSING
+    return json.loads(data), etag
+
+
+def save_manifest(
+    fcast_obsv: Literal["fcast", "obsv"],
+    manifest: dict,
+    if_match: str | None = None,
+):
+    """Write the manifest; with if_match, only over that version of it
+    (see blob.upload_blob_data)."""
+    blob.upload_blob_data(
+        f"{dataset_prefix(fcast_obsv)}/{MANIFEST_NAME}",
+        json.dumps(manifest, indent=1),
+        content_type="application/json",
+        if_match=if_match,
+    )
+
+
+def _update_manifest(fcast_obsv: Literal["fcast", "obsv"], update):
+    """Apply update(manifest) -> manifest and save it conditionally,
+    re-reading and re-applying it if another run saved in between.
+    update gets None if there's no manifest yet."""
+    for attempt in range(MANIFEST_SAVE_ATTEMPTS):
+        manifest, etag = _load_manifest_with_etag(fcast_obsv)
+        try:
+            save_manifest(fcast_obsv, update(manifest), if_match=etag)
+            return
+        except blob.UPLOAD_CONFLICT_ERRORS:
+            logger.warning(
+                f"{fcast_obsv} monitoring manifest changed while updating "
+                f"it (attempt {attempt + 1}); retrying."
+            )
+    raise RuntimeError(
+        f"Could not update the {fcast_obsv} monitoring manifest after "
+        f"{MANIFEST_SAVE_ATTEMPTS} attempts."
+    )
+
+
+def _sort(df: pd.DataFrame, fcast_obsv: Literal["fcast", "obsv"]):
+    sort_cols = [c for c in SORT_COLS[fcast_obsv] if c in df.columns]
+    if df.empty or not sort_cols:
+        return df
+    return df.sort_values(sort_cols, ignore_index=True)
+
+
+def _write_parts(
+    fcast_obsv: Literal["fcast", "obsv"], df: pd.DataFrame
+) -> list[dict]:
+    """Write df as one part per (season, atcf_id); return their manifest
+    entries."""
+    created = pd.Timestamp.now(tz="UTC").strftime(TIMESTAMP_FORMAT)
+    seasons = pd.to_datetime(df["issue_time"]).dt.year
+    entries = []
+    for (season, atcf_id), df_part in df.groupby(
+        [seasons, "atcf_id"], sort=True
+    ):
+        name = (
+            f"{dataset_prefix(fcast_obsv)}/season={season}/"
+            f"atcf_id={atcf_id}/part-{created}-{uuid.uuid4().hex[:8]}.parquet"
+        )
+        blob.upload_parquet_to_blob(
+            name,
+            _sort(df_part, fcast_obsv),
+            index=False,
+            row_group_size=PART_ROW_GROUP_SIZE,
+        )
+        entries.append(
+            {
+                "name": name,
+                "season": int(season),
+                "atcf_id": atcf_id,
+                "rows": len(df_part),
+                "created": created,
+            }
+        )
+    return entries
+
+
+def _supersede(manifest: dict, parts: list[dict]) -> dict:
+    """Move parts from the manifest's parts to its superseded list."""
+    names = {p["name"] for p in parts}
+    now = pd.Timestamp.now(tz="UTC").strftime(TIMESTAMP_FORMAT)
+    manifest["parts"] = [
+        p for p in manifest["parts"] if p["name"] not in names
+    ]
+    manifest.setdefault("superseded", []).extend(
+        {"name": name, "superseded": now} for name in sorted(names)
+    )
+    return manifest
+
+
+def _delete_parts(names):
+    for name in names:
+        try:
+            blob.delete_blob(name)
+        except ResourceNotFoundError:
+            pass
+
+
+def purge_superseded_parts(
+    fcast_obsv: Literal["fcast", "obsv"],
+    grace: pd.Timedelta = SUPERSEDED_GRACE,
+):
+    """Delete the parts superseded more than grace ago."""
+    manifest = load_manifest(fcast_obsv)
+    if manifest is None or not manifest.get("superseded"):
+        return
+    cutoff = (pd.Timestamp.now(tz="UTC") - grace).strftime(TIMESTAMP_FORMAT)
+    expired = []
+
+    def drop_expired(manifest):
+        expired.clear()
+        expired.extend(
+            p["name"]
+            for p in manifest.get("superseded", [])
+            if p["superseded"] <= cutoff
+        )
+        manifest["superseded"] = [
+            p
+            for p in manifest.get("superseded", [])
+            if p["name"] not in expired
+        ]
+        return manifest
+
+    if not any(p["superseded"] <= cutoff for p in manifest["superseded"]):
+        return
+    _update_manifest(fcast_obsv, drop_expired)
+    _delete_parts(expired)
+    logger.info(
+        f"Deleted {len(expired)} superseded {fcast_obsv} monitoring parts."
+    )
+
+
+def _new_manifest_from_legacy(fcast_obsv: Literal["fcast", "obsv"]) -> dict:
+    try:
+        df_legacy = blob.load_parquet_from_blob(legacy_blob_name(fcast_obsv))
+    except ResourceNotFoundError:
+        return {"parts": []}
+    logger.info(
+        f"Migrating {len(df_legacy)} {fcast_obsv} monitoring rows from "
+        f"{legacy_blob_name(fcast_obsv)} to the partitioned store."
+    )
+    return {"parts": _write_parts(fcast_obsv, df_legacy)}
+
+
+def append_monitoring_points(
+    fcast_obsv: Literal["fcast", "obsv"], df_new: pd.DataFrame
+):
+    """Store new monitoring rows as new part files."""
+    if df_new.empty:
+        return
+    new_parts = _write_parts(fcast_obsv, df_new)
+    # the legacy file is migrated at most once, however many attempts the
+    # manifest update takes
+    migrated = None
+    migrated_saved = False
+
+    def add_parts(manifest):
+        nonlocal migrated, migrated_saved
+        migrated_saved = manifest is None
+        if manifest is None:
+            if migrated is None:
+                migrated = _new_manifest_from_legacy(fcast_obsv)["parts"]
+            manifest = {"parts": list(migrated)}
+        manifest["parts"].extend(new_parts)
+        return manifest
+
+    saved = False
+    try:
+        _update_manifest(fcast_obsv, add_parts)
+        saved = True
+    finally:
+        if migrated and not (saved and migrated_saved):
+            # another run created the manifest first (or the update gave
+            # up): no manifest lists the migrated parts
+            _delete_parts(p["name"] for p in migrated)
+    compact_monitoring_points(fcast_obsv, min_parts=COMPACT_AFTER_PARTS)
+
+
+def replace_monitoring_points(
+    fcast_obsv: Literal["fcast", "obsv"], df: pd.DataFrame
+):
+    """Replace the whole dataset with df (the clobber path). The old parts
+    are superseded, not deleted."""
+    manifest, etag = _load_manifest_with_etag(fcast_obsv)
+    new_parts = _write_parts(fcast_obsv, df)
+    if manifest is None:
+        manifest = {"parts": []}
+    manifest = _supersede(manifest, manifest["parts"])
+    manifest["parts"] = new_parts
+    try:
+        save_manifest(fcast_obsv, manifest, if_match=etag)
+    except blob.UPLOAD_CONFLICT_ERRORS:
+        # another run appended meanwhile; keep its data, drop ours (never
+        # in a manifest, so no reader can have them)
+        _delete_parts(p["name"] for p in new_parts)
+        raise
+
+
+def _select_parts(parts: list[dict], filters: list | None) -> list[dict]:
+    """Prune parts on their partition values (atcf_id / season ==, in)."""
+    for col, op, value in filters or []:
+        if col not in ("atcf_id", "season"):
+            continue
+        if op in ("==", "="):
+            parts = [p for p in parts if p[col] == value]
+        elif op == "in":
+            parts = [p for p in parts if p[col] in set(value)]
+    return parts
+
+
+def load_monitoring_points(
+    fcast_obsv: Literal["fcast", "obsv"],
+    columns: list[str] | None = None,
+    filters: list | None = None,
+) -> pd.DataFrame:
+    """All stored monitoring rows, as one DataFrame in the same order as
+    the legacy single file. Raises ResourceNotFoundError if there is
+    no data at all."""
+    for attempt in range(2):
+        manifest = load_manifest(fcast_obsv)
+        if manifest is None:
+            df = blob.load_parquet_from_blob(
+                legacy_blob_name(fcast_obsv), columns=columns, filters=filters
+            )
+            return _sort(df, fcast_obsv)
+        try:
+            return _load_parts(fcast_obsv, manifest, columns, filters)
+        except ResourceNotFoundError as e:
+            # a part purged after we read the manifest (e.g. a read that
+            # outlasted SUPERSEDED_GRACE): the current manifest has its
+            # rows in another part
+            if attempt:
+                raise RuntimeError(
+                    f"{fcast_obsv} monitoring parts kept disappearing "
+                    "while reading them"
+                ) from e
+            logger.warning(
+                f"{fcast_obsv} monitoring part deleted while reading it; "
+                "re-reading the manifest."
+            )
+
+
+def _load_parts(
+    fcast_obsv: Literal["fcast", "obsv"],
+    manifest: dict,
+    columns: list[str] | None,
+    filters: list | None,
+) -> pd.DataFrame:
+    parts = _select_parts(manifest["parts"], filters)
+    # season is a partition key only, not a column in the part files
+    part_filters = [f for f in filters or [] if f[0] != "season"] or None
+    dfs = [
+        blob.load_parquet_from_blob(
+            part["name"], columns=columns, filters=part_filters
+        )
+        for part in parts
+    ]
+    dfs = [df for df in dfs if not df.empty]
+    if not dfs:
+        return pd.DataFrame(columns=columns or ["monitor_id"])
+    return _sort(pd.concat(dfs, ignore_index=True), fcast_obsv)
+
+
+def compact_monitoring_points(
+    fcast_obsv: Literal["fcast", "obsv"], min_parts: int = 2
+):
+    """Merge each partition with at least min_parts part files into one
+    part, superseding the merged parts, then purge the parts superseded
+    more than SUPERSEDED_GRACE ago."""
+    _compact_partitions(fcast_obsv, min_parts)
+    purge_superseded_parts(fcast_obsv)
+
+
+def _compact_partitions(fcast_obsv: Literal["fcast", "obsv"], min_parts: int):
+    manifest, etag = _load_manifest_with_etag(fcast_obsv)
+    if manifest is None:
+        return
+    by_partition = {}
+    for part in manifest["parts"]:
+        key = (part["season"], part["atcf_id"])
+        by_partition.setdefault(key, []).append(part)
+    to_compact = {
+        key: parts
+        for key, parts in by_partition.items()
+        if len(parts) >= min_parts
+    }
+    if not to_compact:
+        return
+
+    replaced = []
+    new_parts = []
+    for (season, atcf_id), parts in to_compact.items():
+        df = pd.concat(
+            [blob.load_parquet_from_blob(p["name"]) for p in parts],
+            ignore_index=True,
+        )
+        new_parts.extend(_write_parts(fcast_obsv, df))
+        replaced.extend(parts)
+        logger.info(
+            f"Compacted {len(parts)} {fcast_obsv} monitoring parts for "
+            f"{atcf_id} ({season})."
+        )
+    manifest = _supersede(manifest, replaced)
+    manifest["parts"] += new_parts
+    try:
+        save_manifest(fcast_obsv, manifest, if_match=etag)
+    except blob.UPLOAD_CONFLICT_ERRORS:
+        # another run updated the manifest meanwhile: leave compaction
+        # to a later run rather than re-doing it here
+        logger.warning(
+            f"{fcast_obsv} monitoring manifest changed during compaction; "
+            "skipping it."
+        )
+        _delete_parts(p["name"] for p in new_parts)
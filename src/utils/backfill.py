@@ -0,0 +1,292 @@
+"""Concurrent, resumable backfills of many small fetch-and-upload tasks.
+
+run_backfill runs BackfillTasks on a bounded worker pool (threads, or
+processes for work that holds the GIL, such as GDAL opens over HTTP).
+Submissions are throttled per host with a token bucket, failed tasks are
+retried with exponential backoff, and throughput (files/s, MB/s) and an
+ETA are logged as the run goes.
+
+With a journal, each finished task is appended to a local JSON-lines
+file as soon as it completes, so a killed run started again with the
+same journal skips everything already done (or known to be missing)
+and replays the journaled results through on_done, e.g. to catch a
+blob manifest up with uploads it never saved.
+"""
+
+import heapq
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+BACKFILL_JOURNAL_DIR = os.getenv("DSCI_BACKFILL_JOURNAL_DIR", ".backfill")
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_ATTEMPTS = 4
+# first retry waits this long, doubling (with jitter) after that
+DEFAULT_BACKOFF_S = 2.0
+# requests per second (and burst size) allowed against each host
+HOST_RATE_LIMITS = {
+    "data.chc.ucsb.edu": (8.0, 8),
+    "gpm1.gesdisc.eosdis.nasa.gov": (4.0, 4),
+}
+DEFAULT_HOST_RATE_LIMIT = (16.0, 16)
+PROGRESS_EVERY_S = 30.0
+
+
+@dataclass(frozen=True)
+class BackfillTask:
+    # unique id of the task, as recorded in the journal
+    key: str
+    # must be picklable (module-level) when run with processes=True;
+    # returns a JSON-serialisable dict, with the bytes moved as "size"
+    func: Callable[..., dict]
+    args: tuple = ()
+    host: str | None = None
+
+
+@dataclass
+class BackfillResult:
+    done: int = 0
+    resumed: int = 0
+    missing: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    nbytes: int = 0
+    elapsed: float = 0.0
+
+
+class TokenBucket:
+    """Allows rate acquisitions per second on average, up to burst at
+    once."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_s = (1 - self.tokens) / self.rate
+            time.sleep(wait_s)
+
+
+class BackfillJournal:
+    """Append-only JSON-lines record of finished tasks, keyed by task
+    key; the last line for a key wins."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a line cut short by a kill mid-write
+                        continue
+                    self.entries[entry["key"]] = entry
+        self._f = open(self.path, "a")
+
+    def finished(self, key: str) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry["status"] in ("done", "missing")
+
+    def write(self, key: str, status: str, **kwargs):
+        entry = {"key": key, "status": status, **kwargs}
+        self.entries[key] = entry
+        self._f.write(json.dumps(entry) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def journal_path(name: str) -> Path:
+    return Path(BACKFILL_JOURNAL_DIR) / f"{name}.jsonl"
+
+
+def _format_eta(seconds: float) -> str:
+    hours, rem = divmod(int(seconds), 3600)
+    return f"{hours}h{rem // 60:02d}m"
+
+
+def run_backfill(
+    tasks: Iterable[BackfillTask],
+    journal: str | Path | None = None,
+    workers: int = DEFAULT_WORKERS,
+    processes: bool = False,
+    initializer: Callable | None = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    backoff_s: float = DEFAULT_BACKOFF_S,
+    is_missing: Callable[[Exception], bool] | None = None,
+    on_done: Callable[[BackfillTask, dict], None] | None = None,
+    progress_every_s: float = PROGRESS_EVERY_S,
+) -> BackfillResult:
+    """Run tasks on a pool of workers, with per-host rate limits, retries
+    and progress logging.
+
+    journal: path of a JSON-lines journal to resume from and append to.
+    processes: run tasks in a process pool rather than threads
+        (initializer runs once in each worker process).
+    is_missing: errors it returns True for aren't retried, and are
+        journaled as missing (e.g. a 404 for a date never published).
+    on_done: called in the calling thread with each task and its
+        result, including results replayed from the journal.
+    """
+    tasks = list(tasks)
+    result = BackfillResult()
+    journal = BackfillJournal(journal) if journal is not None else None
+    pending = []
+    for task in tasks:
+        if journal is not None and journal.finished(task.key):
+            entry = journal.entries[task.key]
+            if entry["status"] == "done":
+                result.resumed += 1
+                if on_done is not None:
+                    on_done(task, entry["result"])
+            else:
+                result.missing.append(task.key)
+            continue
+        pending.append(task)
+    if result.resumed or result.missing:
+        logger.info(
+            f"Resuming backfill: {result.resumed} tasks already done, "
+            f"{len(result.missing)} known missing, {len(pending)} to run"
+        )
+    total = len(pending)
+    missing_before = len(result.missing)
+    pending.reverse()
+    buckets = {}
+    # (ready at, seq, task, attempt) for tasks waiting to be retried
+    retries = []
+    seq = 0
+
+    if processes:
+        executor = ProcessPoolExecutor(workers, initializer=initializer)
+    else:
+        executor = ThreadPoolExecutor(workers, initializer=initializer)
+    start = time.monotonic()
+    last_report = start
+    in_flight = {}
+    try:
+        while pending or retries or in_flight:
+            now = time.monotonic()
+            while len(in_flight) < workers:
+                if retries and retries[0][0] <= now:
+                    _, _, task, attempt = heapq.heappop(retries)
+                elif pending:
+                    task, attempt = pending.pop(), 1
+                else:
+                    break
+                if task.host not in buckets:
+                    buckets[task.host] = TokenBucket(
+                        *HOST_RATE_LIMITS.get(
+                            task.host, DEFAULT_HOST_RATE_LIMIT
+                        )
+                    )
+                buckets[task.host].acquire()
+                future = executor.submit(task.func, *task.args)
+                in_flight[future] = (task, attempt)
+
+            timeout = progress_every_s
+            if retries:
+                timeout = min(
+                    timeout, max(retries[0][0] - time.monotonic(), 0)
+                )
+            if not in_flight:
+                time.sleep(timeout)
+                continue
+            finished, _ = wait(
+                in_flight, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            for future in finished:
+                task, attempt = in_flight.pop(future)
+                try:
+                    task_result = future.result()
+                except Exception as e:
+                    if is_missing is not None and is_missing(e):
+                        result.missing.append(task.key)
+                        if journal is not None:
+                            journal.write(task.key, "missing", error=str(e))
+                    elif attempt < max_attempts:
+                        delay = backoff_s * 2 ** (attempt - 1)
+                        delay *= random.uniform(0.5, 1.5)
+                        logger.debug(
+                            f"Retrying {task.key} in {delay:.1f}s "
+                            f"(attempt {attempt}): {e}"
+                        )
+                        seq += 1
+                        heapq.heappush(
+                            retries,
+                            (time.monotonic() + delay, seq, task, attempt + 1),
+                        )
+                    else:
+                        logger.warning(
+                            f"Backfill task {task.key} failed after "
+                            f"{attempt} attempts: {e}"
+                        )
+                        result.failed.append(task.key)
+                        if journal is not None:
+                            journal.write(task.key, "failed", error=str(e))
+                    continue
+                result.done += 1
+                result.nbytes += task_result.get("size", 0)
+                if journal is not None:
+                    journal.write(task.key, "done", result=task_result)
+                if on_done is not None:
+                    on_done(task, task_result)
+
+            now = time.monotonic()
+            if now - last_report >= progress_every_s:
+                last_report = now
+                _log_progress(result, missing_before, total, now - start)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if journal is not None:
+            journal.close()
+    result.elapsed = time.monotonic() - start
+    _log_progress(result, missing_before, total, result.elapsed)
+    return result
+
+
+def _log_progress(
+    result: BackfillResult, missing_before: int, total: int, elapsed: float
+):
+    missing = len(result.missing) - missing_before
+    finished = result.done + missing + len(result.failed)
+    files_s = result.done / elapsed if elapsed else 0.0
+    mb_s = result.nbytes / 1e6 / elapsed if elapsed else 0.0
+    rate = finished / elapsed if elapsed else 0.0
+    eta = _format_eta((total - finished) / rate) if rate else "?"
+    logger.info(
+        f"Backfill: {finished}/{total} tasks "
+        f"({result.done} done, {missing} missing, "
+        f"{len(result.failed)} failed), "
+        f"{files_s:.2f} files/s, {mb_s:.2f} MB/s, ETA {eta}"
+    )
@@ -1,36 +1,234 @@
+import hashlib
 import io
 import os
 import shutil
 import tempfile
+import threading
 import zipfile
 from typing import Literal
 
-import fsspec
 import geopandas as gpd
 import pandas as pd
-from azure.storage.blob import ContainerClient, ContentSettings
+import requests
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+    ResourceNotModifiedError,
+)
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import ContainerClient, ExponentialRetry
+from requests.adapters import HTTPAdapter
+
+from src.utils import blob_cache, storage
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
 
 PROD_BLOB_SAS = os.getenv("DSCI_AZ_BLOB_PROD_SAS")
 DEV_BLOB_SAS = os.getenv("DSCI_AZ_BLOB_DEV_SAS_WRITE")
-DEV_BLOB_NAME = "imb0chd0dev"
+# storage account names are this plus "prod" or "dev"
+BLOB_ACCOUNT_PREFIX = "imb0chd0"
+DEV_BLOB_NAME = f"{BLOB_ACCOUNT_PREFIX}dev"
 
 PROJECT_PREFIX = "ds-aa-hti-hurricanes"
 
+# Parquet blobs smaller than this are fetched whole (through the disk
+# cache) even when columns/filters are given: below it, the extra range
+# round trips cost more than the bytes they save.
+PARQUET_RANGE_READ_MIN_BYTES = 8 * 1024 * 1024
+# Size of each range read of iter_blob_chunks, and read-ahead buffer of
+# open_blob.
+STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Connection pool and retry settings for the pooled container clients.
+# Change with configure_client_pool() (which drops existing clients).
+CLIENT_POOL_CONFIG = {
+    "pool_maxsize": int(os.getenv("DSCI_AZ_BLOB_POOL_MAXSIZE", "16")),
+    "retry_total": int(os.getenv("DSCI_AZ_BLOB_RETRY_TOTAL", "3")),
+    "retry_initial_backoff": 2,
+    "retry_increment_base": 3,
+}
+
+# One ContainerClient per (account, container, prod/dev), and one HTTP
+# session (keep-alive connection pool) per account, for the life of the
+# process.
+_container_clients = {}
+_account_sessions = {}
+_clients_lock = threading.Lock()
+
+# Blob metadata key holding the sha256 of the uploaded bytes, compared by
+# upload_blob_data(skip_unchanged=True) before writing.
+CONTENT_HASH_METADATA_KEY = "content_sha256"
+# if_match value for "only if the blob doesn't exist yet".
+IF_MISSING = "IF_MISSING"
+# Raised by a conditional upload (if_match) that lost the race.
+UPLOAD_CONFLICT_ERRORS = (ResourceModifiedError, ResourceExistsError)
+_upload_stats = {
+    "uploaded": 0,
+    "uploaded_bytes": 0,
+    "skipped": 0,
+    "skipped_bytes": 0,
+}
+
+
+def _account_name(prod_dev: Literal["prod", "dev"]) -> str:
+    return f"{BLOB_ACCOUNT_PREFIX}{prod_dev}"
+
+
+def _get_account_session(account: str) -> requests.Session:
+    session = _account_sessions.get(account)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=CLIENT_POOL_CONFIG["pool_maxsize"],
+            # retries are handled by the Azure pipeline's retry policy
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        _account_sessions[account] = session
+    return session
+
 
 def get_container_client(
     container_name: str = "projects", prod_dev: Literal["prod", "dev"] = "dev"
 ):
-    sas = DEV_BLOB_SAS if prod_dev == "dev" else PROD_BLOB_SAS
-    container_url = (
-        f"https://imb0chd0{prod_dev}.blob.core.windows.net/"
-        f"{container_name}?{sas}"
+    """Pooled ContainerClient for the container.
+
+    Clients are created once per (account, container, prod/dev) and
+    reused, so repeated blob calls share one HTTP pipeline and its
+    keep-alive connections instead of opening a new TLS session each
+    time.
+    """
+    account = _account_name(prod_dev)
+    key = (account, container_name, prod_dev)
+    client = _container_clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _container_clients.get(key)
+        if client is None:
+            sas = DEV_BLOB_SAS if prod_dev == "dev" else PROD_BLOB_SAS
+            container_url = (
+                f"https://{account}.blob.core.windows.net/"
+                f"{container_name}?{sas}"
+            )
+            client = ContainerClient.from_container_url(
+                container_url,
+                transport=RequestsTransport(
+                    session=_get_account_session(account),
+                    session_owner=False,
+                ),
+                retry_policy=ExponentialRetry(
+                    initial_backoff=CLIENT_POOL_CONFIG[
+                        "retry_initial_backoff"
+                    ],
+                    increment_base=CLIENT_POOL_CONFIG["retry_increment_base"],
+                    retry_total=CLIENT_POOL_CONFIG["retry_total"],
+                ),
+            )
+            _container_clients[key] = client
+    return client
+
+
+def configure_client_pool(**kwargs):
+    """Update CLIENT_POOL_CONFIG (pool_maxsize, retry_total,
+    retry_initial_backoff, retry_increment_base) and drop the existing
+    clients so the next call picks up the new settings."""
+    unknown = set(kwargs) - set(CLIENT_POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown client pool settings: {sorted(unknown)}")
+    CLIENT_POOL_CONFIG.update(kwargs)
+    reset_client_pool()
+
+
+def reset_client_pool():
+    """Close the pooled sessions and forget all container clients."""
+    with _clients_lock:
+        for session in _account_sessions.values():
+            session.close()
+        _account_sessions.clear()
+        _container_clients.clear()
+
+
+def get_client_stats() -> dict:
+    """Connections opened vs reused by the pooled clients.
+
+    Every reused connection is a TCP + TLS handshake saved.
+    """
+    opened = 0
+    n_requests = 0
+    for session in list(_account_sessions.values()):
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools[pool_key]
+                opened += pool.num_connections
+                n_requests += pool.num_requests
+    return {
+        "clients": len(_container_clients),
+        "requests": n_requests,
+        "connections_opened": opened,
+        "connections_reused": max(n_requests - opened, 0),
+    }
+
+
+def _count_upload(n_bytes: int, skipped: bool = False):
+    prefix = "skipped" if skipped else "uploaded"
+    with _clients_lock:
+        _upload_stats[prefix] += 1
+        _upload_stats[f"{prefix}_bytes"] += n_bytes
+
+
+def upload_bytes_and_metadata(data) -> tuple[bytes, dict]:
+    """data (bytes, str or a file-like object) as bytes, with the blob
+    metadata every upload stores (the sha256 of the bytes)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    elif hasattr(data, "read"):
+        data = data.read()
+    return data, {CONTENT_HASH_METADATA_KEY: hashlib.sha256(data).hexdigest()}
+
+
+def get_upload_stats() -> dict:
+    """Uploads written vs skipped as unchanged, with their bytes."""
+    with _clients_lock:
+        return dict(_upload_stats)
+
+
+def log_client_stats():
+    stats = get_client_stats()
+    logger.info(
+        f"Blob clients: {stats['clients']} clients, "
+        f"{stats['requests']} requests, "
+        f"{stats['connections_opened']} connections opened, "
+        f"{stats['connections_reused']} reused"
+    )
+    upload_stats = get_upload_stats()
+    logger.info(
+        f"Blob uploads: {upload_stats['uploaded']} written "
+        f"({upload_stats['uploaded_bytes'] / 1e6:.1f} MB), "
+        f"{upload_stats['skipped']} skipped as unchanged "
+        f"({upload_stats['skipped_bytes'] / 1e6:.1f} MB)"
     )
-    return ContainerClient.from_container_url(container_url)
 
 
-def get_fs():
-    return fsspec.filesystem(
-        "az", account_name=DEV_BLOB_NAME, sas_token=DEV_BLOB_SAS
+def get_fs(prod_dev: Literal["prod", "dev"] = "dev"):
+    """fsspec filesystem for the configured storage backend; paths are
+    <container>/<blob name>."""
+    return storage.get_storage_backend().get_fs(prod_dev)
+
+
+def get_blob_url(
+    blob_name,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+) -> str:
+    """URL (or local path) of a blob, for rasterio/GDAL."""
+    return storage.get_storage_backend().url(
+        blob_name, prod_dev=prod_dev, container_name=container_name
     )
 
 
@@ -39,13 +237,17 @@ def upload_parquet_to_blob(
     df,
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
+    skip_unchanged: bool = False,
+    if_match: str | None = None,
     **kwargs,
 ):
-    upload_blob_data(
+    return upload_blob_data(
         blob_name,
         df.to_parquet(**kwargs),
         prod_dev=prod_dev,
         container_name=container_name,
+        skip_unchanged=skip_unchanged,
+        if_match=if_match,
     )
 
 
@@ -53,11 +255,41 @@ def load_parquet_from_blob(
     blob_name,
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
+    cache: bool = True,
+    columns: list[str] | None = None,
+    filters: list | None = None,
+    stream: bool = False,
 ):
+    """Load a parquet blob, optionally only some columns and the rows
+    matching filters (pyarrow filter syntax, e.g.
+    [("atcf_id", "==", "al132025")]).
+
+    With columns or filters on a large blob, only the footer and the
+    needed row groups / column chunks are fetched, with HTTP range
+    reads; row groups are pruned on their min/max statistics.
+    stream=True always reads that way (bypassing the disk cache), so the
+    raw file is never held in memory as a whole.
+    """
+    if stream or columns is not None or filters is not None:
+        reader = BlobRangeReader(
+            blob_name, prod_dev=prod_dev, container_name=container_name
+        )
+        if stream or reader.size >= PARQUET_RANGE_READ_MIN_BYTES:
+            # pyarrow pre-buffers and coalesces the ranges of each row
+            # group, so reads go straight to the blob unbuffered
+            with reader:
+                return pd.read_parquet(
+                    reader, columns=columns, filters=filters
+                )
     blob_data = load_blob_data(
-        blob_name, prod_dev=prod_dev, container_name=container_name
+        blob_name,
+        prod_dev=prod_dev,
+        container_name=container_name,
+        cache=cache,
+    )
+    return pd.read_parquet(
+        io.BytesIO(blob_data), columns=columns, filters=filters
     )
-    return pd.read_parquet(io.BytesIO(blob_data))
 
 
 def upload_csv_to_blob(
@@ -65,14 +297,18 @@ def upload_csv_to_blob(
     df,
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
+    skip_unchanged: bool = False,
+    if_match: str | None = None,
     **kwargs,
 ):
-    upload_blob_data(
+    return upload_blob_data(
         blob_name,
         df.to_csv(index=False, **kwargs),
         prod_dev=prod_dev,
         content_type="text/csv",
         container_name=container_name,
+        skip_unchanged=skip_unchanged,
+        if_match=if_match,
     )
 
 
@@ -80,17 +316,67 @@ def load_csv_from_blob(
     blob_name,
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
+    cache: bool = True,
+    stream: bool = False,
     **kwargs,
 ):
+    """Load a CSV blob; with stream=True it is parsed as it downloads
+    (see open_blob) instead of from a full in-memory copy."""
+    if stream:
+        with open_blob(
+            blob_name, prod_dev=prod_dev, container_name=container_name
+        ) as f:
+            return pd.read_csv(f, **kwargs)
     blob_data = load_blob_data(
-        blob_name, prod_dev=prod_dev, container_name=container_name
+        blob_name,
+        prod_dev=prod_dev,
+        container_name=container_name,
+        cache=cache,
     )
     return pd.read_csv(io.BytesIO(blob_data), **kwargs)
 
 
+def upload_geoparquet_to_blob(
+    gdf,
+    blob_name,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+):
+    """Upload a GeoDataFrame (or GeoSeries) as GeoParquet (WKB)."""
+    if isinstance(gdf, gpd.GeoSeries):
+        gdf = gpd.GeoDataFrame(geometry=gdf)
+    with io.BytesIO() as buffer:
+        gdf.to_parquet(buffer, index=False)
+        data = buffer.getvalue()
+    upload_blob_data(
+        blob_name, data, prod_dev=prod_dev, container_name=container_name
+    )
+
+
+def load_geoparquet_from_blob(
+    blob_name,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    cache: bool = True,
+):
+    """Load a GeoParquet blob straight from memory (no temp files)."""
+    blob_data = load_blob_data(
+        blob_name,
+        prod_dev=prod_dev,
+        container_name=container_name,
+        cache=cache,
+    )
+    return gpd.read_parquet(io.BytesIO(blob_data))
+
+
 def upload_gdf_to_blob(
     gdf, blob_name, prod_dev: Literal["prod", "dev"] = "dev"
 ):
+    """Upload as GeoParquet if blob_name ends with .parquet, otherwise as
+    a zipped shapefile (legacy format)."""
+    if blob_name.endswith(".parquet"):
+        upload_geoparquet_to_blob(gdf, blob_name, prod_dev=prod_dev)
+        return
     with tempfile.TemporaryDirectory() as temp_dir:
         # File paths for shapefile components within the temp directory
         shp_base_path = os.path.join(temp_dir, "data")
@@ -112,9 +398,18 @@ def upload_gdf_to_blob(
 
 
 def load_gdf_from_blob(
-    blob_name, shapefile: str = None, prod_dev: Literal["prod", "dev"] = "dev"
+    blob_name,
+    shapefile: str = None,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    cache: bool = True,
 ):
-    blob_data = load_blob_data(blob_name, prod_dev=prod_dev)
+    """Load a GeoParquet blob (.parquet) or one shapefile from a zipped
+    shapefile blob (legacy format)."""
+    if blob_name.endswith(".parquet"):
+        return load_geoparquet_from_blob(
+            blob_name, prod_dev=prod_dev, cache=cache
+        )
+    blob_data = load_blob_data(blob_name, prod_dev=prod_dev, cache=cache)
     # use a system temp dir: the repo dir is read-only on Databricks
     with tempfile.TemporaryDirectory() as temp_dir:
         with zipfile.ZipFile(io.BytesIO(blob_data), "r") as zip_ref:
@@ -131,13 +426,148 @@ def load_blob_data(
     blob_name,
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
+    cache: bool = True,
+    return_etag: bool = False,
 ):
-    container_client = get_container_client(
-        prod_dev=prod_dev, container_name=container_name
+    """Download a blob, reading through the local disk cache when one is
+    configured (see src/utils/blob_cache.py) unless cache=False.
+
+    With return_etag, returns (data, etag), e.g. to pass the etag as
+    if_match when writing back a modified copy.
+    """
+    backend = storage.get_storage_backend()
+    location = {"prod_dev": prod_dev, "container_name": container_name}
+    disk_cache = (
+        blob_cache.get_blob_cache() if cache and backend.cacheable else None
+    )
+    if disk_cache is None:
+        data, etag = backend.download(blob_name, **location)
+        return (data, etag) if return_etag else data
+
+    key = disk_cache.key(
+        backend.cache_namespace(prod_dev), container_name, blob_name
+    )
+    entry = disk_cache.lookup(key)
+    data = None
+    if entry is not None:
+        try:
+            data, etag = backend.download(
+                blob_name,
+                **location,
+                etag=entry["etag"],
+                match_condition=MatchConditions.IfModified,
+            )
+        except ResourceNotModifiedError:
+            data = disk_cache.read_hit(key)
+            if data is not None:
+                return (data, entry["etag"]) if return_etag else data
+            data = None
+    if data is None:
+        data, etag = backend.download(blob_name, **location)
+    disk_cache.store(key, etag, data)
+    return (data, etag) if return_etag else data
+
+
+class BlobRangeReader(io.RawIOBase):
+    """Seekable, read-only file over a blob, backed by HTTP range reads.
+
+    Reads are pinned to the ETag seen on open, so a blob overwritten
+    mid-read raises ResourceModifiedError instead of returning a mix of
+    old and new bytes.
+    """
+
+    def __init__(
+        self,
+        blob_name,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+    ):
+        super().__init__()
+        self._backend = storage.get_storage_backend()
+        self._blob_name = blob_name
+        self._location = {
+            "prod_dev": prod_dev,
+            "container_name": container_name,
+        }
+        properties = self._backend.get_properties(blob_name, **self._location)
+        self.size = properties["size"]
+        self.etag = properties["etag"]
+        self.bytes_read = 0
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"Negative seek position: {pos}")
+        self._pos = pos
+        return self._pos
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.size - self._pos)
+        if length <= 0:
+            return 0
+        data, _ = self._backend.download(
+            self._blob_name,
+            **self._location,
+            offset=self._pos,
+            length=length,
+            etag=self.etag,
+            match_condition=MatchConditions.IfNotModified,
+        )
+        n = len(data)
+        buffer[:n] = data
+        self._pos += n
+        self.bytes_read += n
+        return n
+
+
+def open_blob(
+    blob_name,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    buffer_size: int = STREAM_CHUNK_SIZE,
+) -> io.BufferedReader:
+    """Open a blob as a seekable, buffered binary file, read with range
+    reads of buffer_size as it is consumed. For sequential readers (CSV,
+    gzip, ...); pass a BlobRangeReader to pyarrow instead, which plans
+    its own ranges."""
+    return io.BufferedReader(
+        BlobRangeReader(
+            blob_name, prod_dev=prod_dev, container_name=container_name
+        ),
+        buffer_size=buffer_size,
     )
-    blob_client = container_client.get_blob_client(blob_name)
-    data = blob_client.download_blob().readall()
-    return data
+
+
+def iter_blob_chunks(
+    blob_name,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    chunk_size: int = STREAM_CHUNK_SIZE,
+):
+    """Yield the blob's bytes in chunks of up to chunk_size, one range
+    read each (pinned to the blob's etag, like BlobRangeReader)."""
+    with BlobRangeReader(
+        blob_name, prod_dev=prod_dev, container_name=container_name
+    ) as reader:
+        while chunk := reader.read(chunk_size):
+            yield chunk
 
 
 def upload_blob_data(
@@ -146,22 +576,62 @@ def upload_blob_data(
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
     content_type: str = None,
+    skip_unchanged: bool = False,
+    if_match: str | None = None,
 ):
-    container_client = get_container_client(
-        prod_dev=prod_dev, container_name=container_name
-    )
-
+    """Upload data, overwriting, with the sha256 of the bytes stored in the
+    blob's metadata. Returns a dict with the blob's etag and
+    last_modified (and skipped=True if the write was skipped).
+
+    skip_unchanged: don't write if the stored blob already has these
+    exact bytes (one HEAD instead of the upload).
+    if_match: only write if the blob still has this etag (or, with
+    IF_MISSING, doesn't exist yet); otherwise raise one of
+    UPLOAD_CONFLICT_ERRORS, so overlapping runs can't silently overwrite
+    each other.
+    """
+    backend = storage.get_storage_backend()
+    location = {"prod_dev": prod_dev, "container_name": container_name}
     if content_type is None:
-        content_settings = ContentSettings(
-            content_type="application/octet-stream"
-        )
-    else:
-        content_settings = ContentSettings(content_type=content_type)
-
-    blob_client = container_client.get_blob_client(blob_name)
-    blob_client.upload_blob(
-        data, overwrite=True, content_settings=content_settings
+        content_type = "application/octet-stream"
+
+    data, metadata = upload_bytes_and_metadata(data)
+    if skip_unchanged:
+        try:
+            properties = backend.get_properties(blob_name, **location)
+        except ResourceNotFoundError:
+            properties = None
+        if (
+            properties is not None
+            and properties["metadata"].get(CONTENT_HASH_METADATA_KEY)
+            == metadata[CONTENT_HASH_METADATA_KEY]
+        ):
+            _count_upload(len(data), skipped=True)
+            logger.debug(f"Skipped upload of unchanged {blob_name}")
+            return {
+                "etag": properties["etag"],
+                "last_modified": properties["last_modified"],
+                "skipped": True,
+            }
+
+    conditions = {}
+    if if_match == IF_MISSING:
+        conditions = {"match_condition": MatchConditions.IfMissing}
+    elif if_match is not None:
+        conditions = {
+            "etag": if_match,
+            "match_condition": MatchConditions.IfNotModified,
+        }
+    result = backend.upload(
+        blob_name,
+        data,
+        **location,
+        content_type=content_type,
+        metadata=metadata,
+        **conditions,
     )
+    _count_upload(len(data))
+    return result
 
 
 def list_container_blobs(
@@ -169,12 +639,31 @@ def list_container_blobs(
     prod_dev: Literal["prod", "dev"] = "dev",
     container_name: str = "projects",
 ):
-    container_client = get_container_client(
-        prod_dev=prod_dev, container_name=container_name
-    )
     return [
-        blob.name
-        for blob in container_client.list_blobs(
-            name_starts_with=name_starts_with
+        props["name"]
+        for props in list_container_blob_properties(
+            name_starts_with, prod_dev=prod_dev, container_name=container_name
         )
     ]
+
+
+def list_container_blob_properties(
+    name_starts_with=None,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+) -> list[dict]:
+    """Like list_container_blobs, with each blob's size, etag and
+    last_modified."""
+    return storage.get_storage_backend().list(
+        name_starts_with, prod_dev=prod_dev, container_name=container_name
+    )
+
+
+def delete_blob(
+    blob_name,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+):
+    storage.get_storage_backend().delete(
+        blob_name, prod_dev=prod_dev, container_name=container_name
+    )
@@ -0,0 +1,226 @@
+"""Async blob transfers with bounded concurrency, for bulk loops.
+
+Built on the aio Azure SDK (azure.storage.blob.aio, over aiohttp).
+load_many / upload_many are plain sync functions that run the transfers
+on an event loop, so the existing (sync) pipelines can call them
+directly. Results come back in input order, one BlobTransfer per item,
+with any per-item error captured instead of raised, so callers keep
+their own skip/continue logic (e.g. ResourceNotFoundError for a
+leadtime that hasn't landed).
+
+With a non-Azure storage backend (see src/utils/storage.py) the same
+bounded concurrency runs the backend's sync calls in threads.
+"""
+
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Literal
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContentSettings
+
+from src.utils import blob, storage
+
+DEFAULT_CONCURRENCY = 16
+
+
+@dataclass
+class BlobTransfer:
+    blob_name: str
+    data: bytes | None = None
+    error: Exception | None = None
+    etag: str | None = None
+    size: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def not_found(self) -> bool:
+        return isinstance(self.error, ResourceNotFoundError)
+
+
+def _aio_container_client(
+    prod_dev: Literal["prod", "dev"], container_name: str
+):
+    # imported here: the aio SDK pulls in aiohttp, which the monitoring
+    # job's cluster doesn't need for anything else
+    from azure.storage.blob.aio import ContainerClient
+
+    # aio clients are bound to the event loop they run on, so one is
+    # created per call rather than pooled like blob.get_container_client
+    sas = blob.DEV_BLOB_SAS if prod_dev == "dev" else blob.PROD_BLOB_SAS
+    container_url = (
+        f"https://{blob._account_name(prod_dev)}.blob.core.windows.net/"
+        f"{container_name}?{sas}"
+    )
+    return ContainerClient.from_container_url(
+        container_url, retry_total=blob.CLIENT_POOL_CONFIG["retry_total"]
+    )
+
+
+async def aload_many(
+    blob_names: Iterable[str],
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[BlobTransfer]:
+    semaphore = asyncio.Semaphore(concurrency)
+    backend = storage.get_storage_backend()
+    if backend.kind != "azure":
+
+        async def _load_sync(blob_name: str) -> BlobTransfer:
+            async with semaphore:
+                try:
+                    data, etag = await asyncio.to_thread(
+                        backend.download, blob_name, prod_dev, container_name
+                    )
+                    return BlobTransfer(
+                        blob_name, data, etag=etag, size=len(data)
+                    )
+                except Exception as e:
+                    return BlobTransfer(blob_name, error=e)
+
+        return await asyncio.gather(*(_load_sync(name) for name in blob_names))
+
+    async with _aio_container_client(prod_dev, container_name) as client:
+
+        async def _load(blob_name: str) -> BlobTransfer:
+            async with semaphore:
+                try:
+                    downloader = await client.get_blob_client(
+                        blob_name
+                    ).download_blob()
+                    data = await downloader.readall()
+                    return BlobTransfer(
+                        blob_name,
+                        data,
+                        etag=downloader.properties.etag,
+                        size=len(data),
+                    )
+                except Exception as e:
+                    return BlobTransfer(blob_name, error=e)
+
+        return await asyncio.gather(*(_load(name) for name in blob_names))
+
+
+async def aupload_many(
+    items: Iterable[tuple[str, bytes]],
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    content_type: str = "application/octet-stream",
+) -> list[BlobTransfer]:
+    semaphore = asyncio.Semaphore(concurrency)
+    backend = storage.get_storage_backend()
+    if backend.kind != "azure":
+
+        async def _upload_sync(blob_name: str, data) -> BlobTransfer:
+            async with semaphore:
+                try:
+                    result = await asyncio.to_thread(
+                        blob.upload_blob_data,
+                        blob_name,
+                        data,
+                        prod_dev=prod_dev,
+                        container_name=container_name,
+                        content_type=content_type,
+                    )
+                    return BlobTransfer(
+                        blob_name, etag=result["etag"], size=len(data)
+                    )
+                except Exception as e:
+                    return BlobTransfer(blob_name, error=e)
+
+        return await asyncio.gather(
+            *(_upload_sync(name, data) for name, data in items)
+        )
+
+    content_settings = ContentSettings(content_type=content_type)
+    async with _aio_container_client(prod_dev, container_name) as client:
+
+        async def _upload(blob_name: str, data) -> BlobTransfer:
+            async with semaphore:
+                try:
+                    # same bytes, metadata and stats as blob.upload_blob_data
+                    data, metadata = blob.upload_bytes_and_metadata(data)
+                    result = await client.get_blob_client(
+                        blob_name
+                    ).upload_blob(
+                        data,
+                        overwrite=True,
+                        content_settings=content_settings,
+                        metadata=metadata,
+                    )
+                    blob._count_upload(len(data))
+                    return BlobTransfer(
+                        blob_name, etag=result["etag"], size=len(data)
+                    )
+                except Exception as e:
+                    return BlobTransfer(blob_name, error=e)
+
+        return await asyncio.gather(
+            *(_upload(name, data) for name, data in items)
+        )
+
+
+def _run(coro):
+    """Run coro to completion, also from inside a running event loop
+    (e.g. a notebook), by moving it to a fresh loop on another thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    result = {}
+
+    def _target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=_target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def load_many(
+    blob_names: Iterable[str],
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[BlobTransfer]:
+    """Download blobs concurrently; results in the order of blob_names."""
+    return _run(
+        aload_many(
+            list(blob_names),
+            prod_dev=prod_dev,
+            container_name=container_name,
+            concurrency=concurrency,
+        )
+    )
+
+
+def upload_many(
+    items: Iterable[tuple[str, bytes]],
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+    concurrency: int = DEFAULT_CONCURRENCY,
+    content_type: str = "application/octet-stream",
+) -> list[BlobTransfer]:
+    """Upload (blob_name, data) pairs concurrently, overwriting; results
+    in input order."""
+    return _run(
+        aupload_many(
+            list(items),
+            prod_dev=prod_dev,
+            container_name=container_name,
+            concurrency=concurrency,
+            content_type=content_type,
+        )
+    )
@@ -0,0 +1,287 @@
+"""Local read-through disk cache for blob downloads.
+
+Objects are stored content-addressed (by SHA-256) under
+``<cache_dir>/objects``, with a small JSON index mapping each
+(account, container, blob) to the ETag and digest last seen. A cached
+blob is revalidated with a conditional GET (If-None-Match), so an
+unchanged blob costs one 304 round trip instead of a full download.
+
+The cache is off unless DSCI_BLOB_CACHE_DIR is set (or
+configure_blob_cache() is called). It is bounded to
+DSCI_BLOB_CACHE_MAX_MB, evicting least recently used entries first.
+
+Several processes can share a cache directory: the index is only
+written under an exclusive lock on index.lock, merged with what the
+others have written, and eviction works from a scan of the objects on
+disk. Hits only update access times in memory; those are written with
+the next miss, at most every INDEX_FLUSH_S seconds, or at exit.
+"""
+
+import atexit
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+BLOB_CACHE_DIR = os.getenv("DSCI_BLOB_CACHE_DIR")
+BLOB_CACHE_MAX_MB = int(os.getenv("DSCI_BLOB_CACHE_MAX_MB", "2048"))
+# Longest a cache hit's access time waits in memory before the index is
+# rewritten.
+INDEX_FLUSH_S = 30.0
+# Eviction frees space down to this fraction of the size limit, so that
+# it (and its scan of the objects on disk) runs every so many misses
+# rather than on each one.
+EVICT_TO_FRACTION = 0.9
+
+
+class BlobDiskCache:
+    def __init__(self, cache_dir, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_path = self.cache_dir / "index.json"
+        self.lock_path = self.cache_dir / "index.lock"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self._index = self._read_index()
+        # whether _index has access times not yet written
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        # (mtime, size) of the index as we last wrote it, to skip
+        # re-reading it when no other process has written since
+        self._index_stat = None
+        atexit.register(self.flush)
+
+    @staticmethod
+    def key(account: str, container_name: str, blob_name: str) -> str:
+        return f"{account}/{container_name}/{blob_name}"
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """Exclusive lock on the index across processes."""
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_index(self):
+        # atomic replace, so a concurrent reader never sees half a file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_stat = self._stat_index()
+
+    def _stat_index(self) -> tuple | None:
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def lookup(self, key: str) -> dict | None:
+        """Index entry (etag, sha256, size) for the blob, if cached."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            if not self._object_path(entry["sha256"]).exists():
+                del self._index[key]
+                self._dirty = True
+                return None
+            return dict(entry)
+
+    def read_hit(self, key: str) -> bytes | None:
+        """Cached bytes for a blob the server confirmed unchanged."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            try:
+                data = self._object_path(entry["sha256"]).read_bytes()
+            except FileNotFoundError:
+                del self._index[key]
+                self._dirty = True
+                return None
+            entry["last_access"] = time.time()
+            self.hits += 1
+            self.bytes_saved += len(data)
+            self._dirty = True
+            if time.monotonic() - self._flushed_at > INDEX_FLUSH_S:
+                self._flush()
+        return data
+
+    def store(self, key: str, etag: str, data: bytes):
+        """Record a freshly downloaded blob (a cache miss)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        with self._lock, self._index_lock():
+            self.misses += 1
+            # written under the index lock, so another process's eviction
+            # never sees it as an object without an index entry
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._index[key] = {
+                "etag": etag,
+                "sha256": digest,
+                "size": len(data),
+                "last_access": time.time(),
+            }
+            self._sync()
+
+    def flush(self):
+        """Write access times held in memory to the index."""
+        with self._lock:
+            if self._dirty:
+                self._flush()
+
+    def _flush(self):
+        # with self._lock held
+        with self._index_lock():
+            self._sync()
+
+    def _sync(self):
+        """Merge the index on disk into ours (the latest access per key
+        wins), evict if over max_bytes, and write it back. Call with
+        self._lock and the index lock held."""
+        if self._stat_index() != self._index_stat:
+            for key, entry in self._read_index().items():
+                ours = self._index.get(key)
+                if ours is None or entry["last_access"] > ours["last_access"]:
+                    self._index[key] = entry
+        sizes = {e["sha256"]: e["size"] for e in self._index.values()}
+        if sum(sizes.values()) > self.max_bytes:
+            self._evict()
+        self._write_index()
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+
+    def _scan_objects(self) -> dict:
+        """{sha256: size} of the objects on disk."""
+        return {
+            path.name: path.stat().st_size
+            for path in self.objects_dir.glob("*/*")
+            # skip the temp files of writes in progress
+            if len(path.name) == 64
+        }
+
+    def _evict(self):
+        """Drop least recently used entries until the objects on disk fit
+        in EVICT_TO_FRACTION of max_bytes. Also drops entries whose
+        object is gone and objects no entry references. Call with the
+        index lock held."""
+        on_disk = self._scan_objects()
+        self._index = {
+            key: entry
+            for key, entry in self._index.items()
+            if entry["sha256"] in on_disk
+        }
+        # content-addressed: an object may back several keys
+        refs = Counter(entry["sha256"] for entry in self._index.values())
+        for digest in set(on_disk) - set(refs):
+            self._object_path(digest).unlink(missing_ok=True)
+            del on_disk[digest]
+        total = sum(on_disk.values())
+        by_age = sorted(
+            self._index.items(), key=lambda kv: kv[1]["last_access"]
+        )
+        for key, entry in by_age:
+            if total <= self.max_bytes * EVICT_TO_FRACTION:
+                break
+            del self._index[key]
+            digest = entry["sha256"]
+            refs[digest] -= 1
+            if refs[digest] == 0:
+                total -= on_disk.pop(digest)
+                self._object_path(digest).unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock, self._index_lock():
+            for digest in self._scan_objects():
+                self._object_path(digest).unlink(missing_ok=True)
+            self._index = {}
+            self._write_index()
+            self._dirty = False
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_saved": self.bytes_saved,
+            "entries": len(self._index),
+            "size_bytes": sum(
+                {e["sha256"]: e["size"] for e in self._index.values()}.values()
+            ),
+        }
+
+
+_blob_cache = None
+_blob_cache_lock = threading.Lock()
+
+
+def get_blob_cache() -> BlobDiskCache | None:
+    """The process-wide cache, or None if caching is not configured."""
+    global _blob_cache
+    if BLOB_CACHE_DIR is None:
+        return None
+    if _blob_cache is None:
+        with _blob_cache_lock:
+            if _blob_cache is None:
+                _blob_cache = BlobDiskCache(
+                    BLOB_CACHE_DIR, BLOB_CACHE_MAX_MB * 1024 * 1024
+                )
+    return _blob_cache
+
+
+def configure_blob_cache(
+    cache_dir: str | None, max_mb: int = BLOB_CACHE_MAX_MB
+):
+    """Point the cache at cache_dir (None disables it)."""
+    global BLOB_CACHE_DIR, BLOB_CACHE_MAX_MB, _blob_cache
+    with _blob_cache_lock:
+        BLOB_CACHE_DIR = None if cache_dir is None else str(cache_dir)
+        BLOB_CACHE_MAX_MB = max_mb
+        _blob_cache = None
+
+
+def log_blob_cache_stats():
+    cache = get_blob_cache()
+    if cache is None:
+        return
+    cache.flush()
+    stats = cache.stats()
+    logger.info(
+        f"Blob cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['bytes_saved'] / 1e6:.1f} MB saved "
+        f"({stats['entries']} entries, "
+        f"{stats['size_bytes'] / 1e6:.1f} MB on disk)"
+    )
@@ -0,0 +1,204 @@
+"""Maintained index of the blobs under a dataset prefix.
+
+Large raw datasets (one CHIRPS-GEFS tif per issue x valid date, one CSV
+per NHC a-deck) used to be enumerated with a paged list_container_blobs
+scan every run, then checked with `in` against a list. A BlobManifest
+keeps name, size, ETag and the keys parsed from each name in a single
+small parquet next to the data (<prefix>/_manifest.parquet): loading it
+is one GET, and membership checks by name or by parsed key are O(1).
+
+Writers record() each upload and save() when done. If the manifest is
+missing (or refresh=True) it is rebuilt from one listing of the prefix.
+
+save() writes with If-Match on the ETag the manifest was loaded at, so
+concurrent writers don't drop each other's records: on a conflict it
+reloads the stored manifest, re-applies what it recorded since loading
+and tries again.
+
+Blobs written under the prefix without record() (by hand, or by a
+helper not given the manifest) are not in it until the next
+load(refresh=True) or rebuild().
+"""
+
+from io import BytesIO
+from typing import Callable, Literal
+
+import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
+
+from src.utils import blob
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "_manifest.parquet"
+# Attempts at a conditional save before giving up.
+SAVE_ATTEMPTS = 5
+
+
+class BlobManifest:
+    def __init__(
+        self,
+        prefix: str,
+        key_parser: Callable[[str], dict | None],
+        key_cols: list[str],
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+    ):
+        """key_parser maps a blob name to its key values ({col: value} for
+        every col in key_cols), or None for blobs that aren't part of
+        the dataset."""
+        self.prefix = prefix.rstrip("/")
+        self.key_parser = key_parser
+        self.key_cols = key_cols
+        self.prod_dev = prod_dev
+        self.container_name = container_name
+        self.blob_name = f"{self.prefix}/{MANIFEST_NAME}"
+        self._entries = {}
+        self._by_key = {}
+        # entries recorded since the last load or save, re-applied if the
+        # stored manifest changed in between
+        self._pending = {}
+        # ETag of the stored manifest as loaded (None: not stored yet)
+        self._etag = None
+
+    def _add(self, name: str, size, etag, last_modified=None) -> bool:
+        keys = self.key_parser(name)
+        if keys is None:
+            return False
+        entry = {
+            "name": name,
+            "size": size,
+            "etag": etag,
+            "last_modified": last_modified,
+            **keys,
+        }
+        self._set(entry)
+        return True
+
+    def _set(self, entry: dict):
+        self._entries[entry["name"]] = entry
+        self._by_key[tuple(entry[col] for col in self.key_cols)] = entry[
+            "name"
+        ]
+
+    def _read(self) -> bool:
+        """Replace the entries with the stored manifest; False if there
+        is none."""
+        try:
+            data, etag = blob.load_blob_data(
+                self.blob_name,
+                prod_dev=self.prod_dev,
+                container_name=self.container_name,
+                cache=False,
+                return_etag=True,
+            )
+        except ResourceNotFoundError:
+            self._etag = None
+            return False
+        self._entries = {}
+        self._by_key = {}
+        for row in pd.read_parquet(BytesIO(data)).to_dict("records"):
+            self._set(row)
+        self._etag = etag
+        return True
+
+    def load(self, refresh: bool = False) -> "BlobManifest":
+        """Load the stored manifest, rebuilding it from a listing if it
+        doesn't exist yet or refresh is set."""
+        if not refresh:
+            if self._read():
+                self._pending = {}
+                return self
+            logger.info(f"No manifest at {self.blob_name}; building.")
+        self.rebuild()
+        return self
+
+    def rebuild(self):
+        """Re-index from a full listing of the prefix, and save."""
+        self._entries = {}
+        self._by_key = {}
+        # the listing includes the stored manifest, if any, whose ETag
+        # the save is conditional on
+        self._etag = None
+        for props in blob.list_container_blob_properties(
+            name_starts_with=f"{self.prefix}/",
+            prod_dev=self.prod_dev,
+            container_name=self.container_name,
+        ):
+            if props["name"] == self.blob_name:
+                self._etag = props["etag"]
+            self._add(**props)
+        logger.info(f"Indexed {len(self)} blobs under {self.prefix}/")
+        self._pending = dict(self._entries)
+        self._write()
+
+    def record(self, name: str, size: int | None, etag: str | None):
+        """Record a blob just written under the prefix."""
+        if self._add(
+            name, size, etag, pd.Timestamp.now(tz="UTC").to_pydatetime()
+        ):
+            self._pending[name] = self._entries[name]
+
+    def save(self):
+        """Store the manifest if anything was recorded since it was
+        loaded or last saved, merging with concurrent saves."""
+        if self._pending:
+            self._write()
+
+    def _write(self):
+        for attempt in range(SAVE_ATTEMPTS):
+            try:
+                result = blob.upload_parquet_to_blob(
+                    self.blob_name,
+                    self.to_frame(),
+                    prod_dev=self.prod_dev,
+                    container_name=self.container_name,
+                    if_match=self._etag or blob.IF_MISSING,
+                    index=False,
+                )
+            except blob.UPLOAD_CONFLICT_ERRORS:
+                logger.warning(
+                    f"{self.blob_name} changed since it was loaded "
+                    f"(attempt {attempt + 1}); merging and retrying."
+                )
+                self._read()
+                for entry in self._pending.values():
+                    self._set(entry)
+                continue
+            self._etag = result["etag"]
+            self._pending = {}
+            return
+        raise RuntimeError(
+            f"Could not save {self.blob_name} after {SAVE_ATTEMPTS} attempts."
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        cols = ["name", "size", "etag", "last_modified"] + self.key_cols
+        return pd.DataFrame(list(self._entries.values()), columns=cols)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def has_key(self, *key) -> bool:
+        return tuple(key) in self._by_key
+
+    def get(self, name: str) -> dict | None:
+        return self._entries.get(name)
+
+    def get_by_key(self, *key) -> dict | None:
+        name = self._by_key.get(tuple(key))
+        return None if name is None else self._entries[name]
+
+    def names(self) -> list[str]:
+        return list(self._entries)
+
+    def keys(self) -> set[tuple]:
+        return set(self._by_key)
+
+    def missing(self, keys) -> list[tuple]:
+        """The keys (tuples in key_cols order) not in the manifest."""
+        return [key for key in keys if tuple(key) not in self._by_key]
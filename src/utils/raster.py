@@ -1,5 +1,44 @@
+import hashlib
+import io
+
 import numpy as np
+import pandas as pd
+import rasterio
+import rasterio.features
+import rioxarray as rxr
+import shapely
 import xarray as xr
+from azure.core.exceptions import ResourceNotFoundError
+
+from src.utils import blob
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# GDAL settings for windowed reads of remote GeoTIFFs over HTTP: no
+# directory listing or sidecar (.aux.xml, .ovr) probes on open, the
+# header in one request, consecutive blocks/strips merged into single
+# range requests (multiplexed over one HTTP/2 connection where the server
+# supports it), and a block cache for re-reads.
+REMOTE_READ_GDAL_ENV = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.tiff",
+    "GDAL_INGESTED_BYTES_AT_OPEN": "32768",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "GDAL_HTTP_VERSION": "2",
+    "VSI_CACHE": "TRUE",
+    "VSI_CACHE_SIZE": str(32 * 1024 * 1024),
+}
+
+# fractional-coverage weight masks, as .npy sidecars named by
+# coverage_weights_key
+COVERAGE_WEIGHTS_BLOB_DIR = f"{blob.PROJECT_PREFIX}/processed/weights"
+_coverage_weights = {}
+# zonal_mean weightings: "coverage" weights each pixel by the fraction
+# of it inside the geometry, "all_touched" counts every pixel the
+# geometry touches in full, like rio.clip(all_touched=True) + mean
+ZONAL_MEAN_METHODS = ["coverage", "all_touched"]
 
 
 def upsample_dataarray(
@@ -22,3 +61,241 @@ def upsample_dataarray(
         method="nearest",
         kwargs={"fill_value": "extrapolate"},
     )
+
+
+def read_remote_window(url: str, bounds) -> xr.DataArray:
+    """Read the part of a remote GeoTIFF within bounds (minx, miny, maxx,
+    maxy, in the raster's CRS), fetching only the blocks or strips that
+    intersect it, with REMOTE_READ_GDAL_ENV."""
+    with rasterio.Env(**REMOTE_READ_GDAL_ENV):
+        with rxr.open_rasterio(url) as da:
+            # load inside the env: the lazy read happens here, not later
+            return da.rio.clip_box(*bounds).load()
+
+
+def coverage_weights_key(
+    da: xr.DataArray, geometry, x_dim: str = "x", y_dim: str = "y"
+) -> str:
+    """Hash of the grid (CRS, pixel centres along x and y) and of the
+    geometry (or of each geometry in order, for zones), identifying a
+    weight mask."""
+    h = hashlib.sha256()
+    h.update(str(da.rio.crs).encode())
+    for dim in [x_dim, y_dim]:
+        h.update(np.round(da[dim].values.astype("float64"), 9).tobytes())
+    for geom in geometry:
+        h.update(shapely.to_wkb(geom))
+    return h.hexdigest()[:16]
+
+
+def _compute_coverage_weights(x: np.ndarray, y: np.ndarray, geometry):
+    """Fraction of each (y, x) pixel's area inside geometry, from the
+    exact intersection of each pixel box with the geometry."""
+    # pixel edges halfway between centres, extrapolated at the ends
+    dx = np.diff(x).mean() if len(x) > 1 else 1.0
+    dy = np.diff(y).mean() if len(y) > 1 else 1.0
+    xx, yy = np.meshgrid(x, y)
+    boxes = shapely.box(
+        xx - abs(dx) / 2, yy - abs(dy) / 2, xx + abs(dx) / 2, yy + abs(dy) / 2
+    )
+    geom = shapely.union_all(geometry)
+    shapely.prepare(geom)
+    weights = np.zeros(boxes.shape)
+    touched = shapely.intersects(geom, boxes)
+    weights[touched] = shapely.area(
+        shapely.intersection(boxes[touched], geom)
+    ) / shapely.area(boxes[touched])
+    return weights
+
+
+def _cached_weights(key: str, compute) -> np.ndarray:
+    """Weights memoised in-process and stored as a .npy sidecar blob, so
+    they're computed once per grid and geometry."""
+    if key not in _coverage_weights:
+        blob_name = f"{COVERAGE_WEIGHTS_BLOB_DIR}/{key}.npy"
+        try:
+            weights = np.load(io.BytesIO(blob.load_blob_data(blob_name)))
+        except ResourceNotFoundError:
+            weights = compute()
+            buffer = io.BytesIO()
+            np.save(buffer, weights)
+            blob.upload_blob_data(blob_name, buffer.getvalue())
+            logger.info(f"Stored coverage weights {blob_name}")
+        _coverage_weights[key] = weights
+    return _coverage_weights[key]
+
+
+def coverage_weights(
+    da: xr.DataArray, geometry, x_dim: str = "x", y_dim: str = "y"
+) -> xr.DataArray:
+    """(y, x) weights: the fraction of each pixel of da's grid covered by
+    geometry (a GeoSeries in da's CRS, e.g. adm0.geometry).
+
+    Computed once per grid and geometry (see _cached_weights).
+    """
+    geom = shapely.union_all(geometry)
+    weights = _cached_weights(
+        coverage_weights_key(da, [geom], x_dim=x_dim, y_dim=y_dim),
+        lambda: _compute_coverage_weights(
+            da[x_dim].values, da[y_dim].values, geom
+        ),
+    )
+    return xr.DataArray(
+        weights,
+        dims=[y_dim, x_dim],
+        coords={y_dim: da[y_dim], x_dim: da[x_dim]},
+    )
+
+
+def zone_coverage_weights(
+    da: xr.DataArray,
+    zones,
+    id_col: str,
+    x_dim: str = "x",
+    y_dim: str = "y",
+) -> xr.DataArray:
+    """(zone, y, x) weights: for each row of the GeoDataFrame zones
+    (labelled by id_col), the fraction of each pixel it covers."""
+    weights = _cached_weights(
+        coverage_weights_key(da, zones.geometry, x_dim=x_dim, y_dim=y_dim),
+        lambda: np.stack(
+            [
+                _compute_coverage_weights(
+                    da[x_dim].values, da[y_dim].values, geom
+                )
+                for geom in zones.geometry
+            ]
+        ),
+    )
+    return xr.DataArray(
+        weights,
+        dims=["zone", y_dim, x_dim],
+        coords={
+            "zone": zones[id_col].values,
+            y_dim: da[y_dim],
+            x_dim: da[x_dim],
+        },
+    )
+
+
+def touched_weights(
+    da: xr.DataArray, geometry, x_dim: str = "x", y_dim: str = "y"
+) -> xr.DataArray:
+    """(y, x) weights: 1 for each pixel of da's grid that geometry
+    touches (the pixels rio.clip(all_touched=True) keeps), 0 otherwise.
+
+    Computed once per grid and geometry (see _cached_weights).
+    """
+    geom = shapely.union_all(geometry)
+    weights = _cached_weights(
+        coverage_weights_key(da, [geom], x_dim=x_dim, y_dim=y_dim)
+        + "-touched",
+        lambda: rasterio.features.geometry_mask(
+            [geom],
+            out_shape=(da.sizes[y_dim], da.sizes[x_dim]),
+            transform=da.rio.transform(),
+            all_touched=True,
+            invert=True,
+        ).astype("float64"),
+    )
+    return xr.DataArray(
+        weights,
+        dims=[y_dim, x_dim],
+        coords={y_dim: da[y_dim], x_dim: da[x_dim]},
+    )
+
+
+def zonal_mean(
+    da: xr.DataArray,
+    geometry,
+    x_dim: str = "x",
+    y_dim: str = "y",
+    method: str = "coverage",
+) -> xr.DataArray:
+    """Mean of da over geometry, weighting each pixel as method (one of
+    ZONAL_MEAN_METHODS) says (NaN and nodata pixels are left out)."""
+    if method == "coverage":
+        weights = coverage_weights(da, geometry, x_dim=x_dim, y_dim=y_dim)
+    elif method == "all_touched":
+        weights = touched_weights(da, geometry, x_dim=x_dim, y_dim=y_dim)
+    else:
+        raise ValueError(
+            f"Unknown zonal mean method {method!r}; expected one of "
+            f"{ZONAL_MEAN_METHODS}"
+        )
+    if da.rio.nodata is not None and not np.isnan(da.rio.nodata):
+        da = da.where(da != da.rio.nodata)
+    return da.weighted(weights).mean(dim=[x_dim, y_dim])
+
+
+def zonal_stats(
+    da: xr.DataArray,
+    zones,
+    id_col: str,
+    percentiles=(),
+    x_dim: str = "x",
+    y_dim: str = "y",
+) -> xr.Dataset:
+    """Mean, max and percentiles of da over every zone at once, with a
+    zone dimension (labelled by id_col) replacing x and y.
+
+    The means are coverage-weighted, as in zonal_mean, and all come from
+    one matrix product of the pixels with the (zone, pixel) weight
+    matrix. Max and percentiles are over the pixels each zone touches.
+    NaN and nodata pixels are left out.
+    """
+    weights = zone_coverage_weights(
+        da, zones, id_col, x_dim=x_dim, y_dim=y_dim
+    )
+    if da.rio.nodata is not None and not np.isnan(da.rio.nodata):
+        da = da.where(da != da.rio.nodata)
+    da = da.transpose(..., y_dim, x_dim)
+    other_dims = da.dims[:-2]
+    values = np.asarray(da.values, dtype="float64").reshape(
+        -1, da.sizes[y_dim] * da.sizes[x_dim]
+    )
+    w = weights.values.reshape(weights.sizes["zone"], -1)
+    valid = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (np.where(valid, values, 0) @ w.T) / (valid @ w.T)
+
+    maxs = np.full(means.shape, np.nan)
+    pcts = np.full((len(percentiles),) + means.shape, np.nan)
+    for i, touched in enumerate(w > 0):
+        zone_values = values[:, touched]
+        has_values = valid[:, touched].any(axis=1)
+        if not has_values.any():
+            continue
+        maxs[has_values, i] = np.nanmax(zone_values[has_values], axis=1)
+        if percentiles:
+            pcts[:, has_values, i] = np.nanpercentile(
+                zone_values[has_values], percentiles, axis=1
+            )
+
+    shape = tuple(da.sizes[dim] for dim in other_dims) + (w.shape[0],)
+    dims = other_dims + ("zone",)
+    coords = {dim: da[dim].values for dim in other_dims if dim in da.coords}
+    coords["zone"] = weights["zone"].values
+    ds = xr.Dataset(
+        {
+            "mean": (dims, means.reshape(shape)),
+            "max": (dims, maxs.reshape(shape)),
+        },
+        coords=coords,
+    )
+    for q, pct in zip(percentiles, pcts):
+        ds[f"q{q}"] = (dims, pct.reshape(shape))
+    return ds
+
+
+def zonal_stats_long(ds: xr.Dataset, id_col: str) -> pd.DataFrame:
+    """zonal_stats output as a long frame: one row per zone x stat (x any
+    other dims), with columns <other dims>, id_col, stat, value."""
+    df = ds.to_dataframe().reset_index().rename(columns={"zone": id_col})
+    id_cols = [c for c in df.columns if c not in ds.data_vars]
+    return df.melt(
+        id_vars=id_cols,
+        value_vars=list(ds.data_vars),
+        var_name="stat",
+        value_name="value",
+    )
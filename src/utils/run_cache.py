@@ -0,0 +1,122 @@
+"""Run-scoped memoisation of loaders called many times per pipeline run.
+
+Functions decorated with run_cached are only memoised inside a
+run_scope(); outside one (e.g. in notebooks, or pipelines that write
+what they then read back) they call straight through. Within a scope a
+call with the same arguments returns the cached value (pandas objects
+are copied, so callers can't mutate the cached one), until the entry is
+dropped with invalidate(). Stats (calls, hits, time saved) are logged
+when the scope closes.
+"""
+
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from typing import Callable
+
+import pandas as pd
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class RunCache:
+    def __init__(self):
+        self._values = {}
+        # seconds the first (computing) call took, per key
+        self._seconds = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, key, compute: Callable):
+        with self._lock:
+            stats = self.stats.setdefault(
+                name, {"calls": 0, "hits": 0, "seconds_saved": 0.0}
+            )
+            stats["calls"] += 1
+            if (name, key) in self._values:
+                stats["hits"] += 1
+                stats["seconds_saved"] += self._seconds[(name, key)]
+                return _copy(self._values[(name, key)])
+        start = time.perf_counter()
+        value = compute()
+        with self._lock:
+            self._values[(name, key)] = value
+            self._seconds[(name, key)] = time.perf_counter() - start
+        return _copy(value)
+
+    def invalidate(self, name: str | None = None):
+        with self._lock:
+            for cache_key in list(self._values):
+                if name is None or cache_key[0] == name:
+                    del self._values[cache_key]
+                    del self._seconds[cache_key]
+
+    def log_stats(self):
+        for name, stats in self.stats.items():
+            logger.info(
+                f"Run cache {name}: {stats['calls']} calls, "
+                f"{stats['hits']} hits, "
+                f"{stats['seconds_saved']:.1f}s saved"
+            )
+
+
+_run_cache = None
+
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+def _func_name(func: Callable) -> str:
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def get_run_cache() -> RunCache | None:
+    return _run_cache
+
+
+@contextlib.contextmanager
+def run_scope():
+    """Memoise run_cached functions until the block exits."""
+    global _run_cache
+    previous = _run_cache
+    _run_cache = RunCache()
+    try:
+        yield _run_cache
+    finally:
+        _run_cache.log_stats()
+        _run_cache = previous
+
+
+def run_cached(func: Callable) -> Callable:
+    """Memoise func, keyed by its arguments, within the current
+    run_scope()."""
+    name = _func_name(func)
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _run_cache
+        if cache is None:
+            return func(*args, **kwargs)
+        # bound with defaults, so f() and f(x=default) share an entry;
+        # repr, so that list arguments (e.g. columns) can be keys
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = repr(sorted(bound.arguments.items()))
+        return cache.get(name, key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def invalidate(func: Callable | None = None):
+    """Drop the cached results of func (all functions if None), e.g.
+    after writing the blob it loads."""
+    if _run_cache is not None:
+        _run_cache.invalidate(None if func is None else _func_name(func))
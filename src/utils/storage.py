@@ -0,0 +1,522 @@
+"""Storage backends behind the helpers in src/utils/blob.py.
+
+Every blob helper (bytes, parquet, CSV, GDF, range reads, listing,
+deletes, the async bulk transfers, fsspec access and raster URLs) goes
+through the configured backend:
+
+- "azure" (default): the imb0chd0{prod_dev} storage accounts, with the
+  pooled clients from blob.get_container_client.
+- "local": a directory tree, <root>/<prod_dev>/<container>/<blob name>,
+  so the pipelines can run (and be profiled) against a local fixture
+  tree without a storage account. Seed one with mirror_prefix().
+
+Select with DSCI_STORAGE_BACKEND=local and DSCI_STORAGE_LOCAL_ROOT, or
+configure_storage(). Both backends raise the azure.core exceptions
+(ResourceNotFoundError etc.), so callers' error handling doesn't
+depend on the backend.
+"""
+
+import abc
+import datetime
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Literal
+
+import fsspec
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+    ResourceNotModifiedError,
+)
+from azure.storage.blob import ContentSettings
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+STORAGE_BACKEND = os.getenv("DSCI_STORAGE_BACKEND", "azure")
+STORAGE_LOCAL_ROOT = os.getenv("DSCI_STORAGE_LOCAL_ROOT")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class StorageBackend(abc.ABC):
+    """Blob operations the helpers in blob.py are built on.
+
+    Conditional operations take an etag plus an
+    azure.core.MatchConditions, with the SDK's semantics.
+    """
+
+    kind = None
+    # whether downloads are worth keeping in the disk cache (blob_cache)
+    cacheable = False
+
+    @abc.abstractmethod
+    def cache_namespace(self, prod_dev: Literal["prod", "dev"]) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def download(
+        self,
+        blob_name: str,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+        offset: int | None = None,
+        length: int | None = None,
+        etag: str | None = None,
+        match_condition: MatchConditions | None = None,
+    ) -> tuple[bytes, str]:
+        """(data, etag) for the blob, or the byte range from offset."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_properties(
+        self,
+        blob_name: str,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+    ) -> dict:
+        """name, size, etag, last_modified and metadata of the blob."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upload(
+        self,
+        blob_name: str,
+        data: bytes,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+        content_type: str = "application/octet-stream",
+        metadata: dict | None = None,
+        etag: str | None = None,
+        match_condition: MatchConditions | None = None,
+    ) -> dict:
+        """Write the blob, overwriting; returns its etag and
+        last_modified."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list(
+        self,
+        name_starts_with: str | None = None,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+    ) -> list[dict]:
+        """name, size, etag and last_modified of each blob, by name."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(
+        self,
+        blob_name: str,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+    ):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def url(
+        self,
+        blob_name: str,
+        prod_dev: Literal["prod", "dev"] = "dev",
+        container_name: str = "projects",
+    ) -> str:
+        """Location of the blob for GDAL/rasterio and other readers that
+        open paths rather than bytes."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_fs(
+        self, prod_dev: Literal["prod", "dev"] = "dev"
+    ) -> fsspec.AbstractFileSystem:
+        """fsspec filesystem on which paths are <container>/<blob name>."""
+        raise NotImplementedError
+
+
+class AzureBlobStorage(StorageBackend):
+    kind = "azure"
+    cacheable = True
+
+    @staticmethod
+    def _blob_client(blob_name, prod_dev, container_name):
+        # imported here: blob.py imports this module for the backend
+        from src.utils import blob
+
+        container_client = blob.get_container_client(
+            prod_dev=prod_dev, container_name=container_name
+        )
+        return container_client.get_blob_client(blob_name)
+
+    @staticmethod
+    def _sas(prod_dev):
+        from src.utils import blob
+
+        return blob.DEV_BLOB_SAS if prod_dev == "dev" else blob.PROD_BLOB_SAS
+
+    @staticmethod
+    def _account(prod_dev):
+        from src.utils import blob
+
+        return blob._account_name(prod_dev)
+
+    def cache_namespace(self, prod_dev):
+        return self._account(prod_dev)
+
+    def download(
+        self,
+        blob_name,
+        prod_dev="dev",
+        container_name="projects",
+        offset=None,
+        length=None,
+        etag=None,
+        match_condition=None,
+    ):
+        kwargs = {}
+        if offset is not None:
+            kwargs.update(offset=offset, length=length)
+        if match_condition is not None:
+            kwargs.update(etag=etag, match_condition=match_condition)
+        downloader = self._blob_client(
+            blob_name, prod_dev, container_name
+        ).download_blob(**kwargs)
+        data = downloader.readall()
+        return data, downloader.properties.etag
+
+    def get_properties(
+        self, blob_name, prod_dev="dev", container_name="projects"
+    ):
+        properties = self._blob_client(
+            blob_name, prod_dev, container_name
+        ).get_blob_properties()
+        return {
+            "name": blob_name,
+            "size": properties.size,
+            "etag": properties.etag,
+            "last_modified": properties.last_modified,
+            "metadata": properties.metadata,
+        }
+
+    def upload(
+        self,
+        blob_name,
+        data,
+        prod_dev="dev",
+        container_name="projects",
+        content_type="application/octet-stream",
+        metadata=None,
+        etag=None,
+        match_condition=None,
+    ):
+        kwargs = {}
+        if match_condition is not None:
+            kwargs.update(etag=etag, match_condition=match_condition)
+        result = self._blob_client(
+            blob_name, prod_dev, container_name
+        ).upload_blob(
+            data,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type),
+            metadata=metadata,
+            **kwargs,
+        )
+        return {
+            "etag": result["etag"],
+            "last_modified": result["last_modified"],
+        }
+
+    def list(
+        self, name_starts_with=None, prod_dev="dev", container_name="projects"
+    ):
+        from src.utils import blob
+
+        container_client = blob.get_container_client(
+            prod_dev=prod_dev, container_name=container_name
+        )
+        return [
+            {
+                "name": props.name,
+                "size": props.size,
+                "etag": props.etag,
+                "last_modified": props.last_modified,
+            }
+            for props in container_client.list_blobs(
+                name_starts_with=name_starts_with
+            )
+        ]
+
+    def delete(self, blob_name, prod_dev="dev", container_name="projects"):
+        self._blob_client(blob_name, prod_dev, container_name).delete_blob()
+
+    def url(self, blob_name, prod_dev="dev", container_name="projects"):
+        return (
+            f"https://{self._account(prod_dev)}.blob.core.windows.net/"
+            f"{container_name}/{blob_name}?{self._sas(prod_dev)}"
+        )
+
+    def get_fs(self, prod_dev="dev"):
+        return fsspec.filesystem(
+            "az",
+            account_name=self._account(prod_dev),
+            sas_token=self._sas(prod_dev),
+        )
+
+
+class LocalStorage(StorageBackend):
+    """Blobs as files under root/<prod_dev>/<container>/.
+
+    ETags are derived from the file's mtime and size (as web servers
+    do), and blob metadata is kept in JSON sidecars under root/.meta, so
+    conditional and skip-unchanged uploads behave as on Azure. Writes go
+    through a temp file and an atomic rename.
+    """
+
+    kind = "local"
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _path(self, blob_name, prod_dev, container_name) -> Path:
+        return self.root / prod_dev / container_name / blob_name
+
+    def _meta_path(self, blob_name, prod_dev, container_name) -> Path:
+        return (
+            self.root
+            / ".meta"
+            / prod_dev
+            / container_name
+            / (f"{blob_name}.json")
+        )
+
+    @staticmethod
+    def _stat_props(path: Path) -> dict:
+        stat = path.stat()
+        return {
+            "size": stat.st_size,
+            "etag": f'"0x{stat.st_mtime_ns:x}{stat.st_size:x}"',
+            "last_modified": datetime.datetime.fromtimestamp(
+                stat.st_mtime, tz=datetime.timezone.utc
+            ),
+        }
+
+    def _current_etag(self, path: Path) -> str | None:
+        try:
+            return self._stat_props(path)["etag"]
+        except FileNotFoundError:
+            return None
+
+    def cache_namespace(self, prod_dev):
+        return f"local:{self.root}/{prod_dev}"
+
+    def download(
+        self,
+        blob_name,
+        prod_dev="dev",
+        container_name="projects",
+        offset=None,
+        length=None,
+        etag=None,
+        match_condition=None,
+    ):
+        path = self._path(blob_name, prod_dev, container_name)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"The blob {blob_name} not found.")
+        with f:
+            current = self._stat_props(path)["etag"]
+            if match_condition == MatchConditions.IfModified and (
+                current == etag
+            ):
+                raise ResourceNotModifiedError("Not modified.")
+            if match_condition == MatchConditions.IfNotModified and (
+                current != etag
+            ):
+                raise ResourceModifiedError(f"{blob_name} was modified.")
+            if offset is not None:
+                f.seek(offset)
+                data = f.read(length) if length is not None else f.read()
+            else:
+                data = f.read()
+        return data, current
+
+    def get_properties(
+        self, blob_name, prod_dev="dev", container_name="projects"
+    ):
+        path = self._path(blob_name, prod_dev, container_name)
+        try:
+            props = self._stat_props(path)
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"The blob {blob_name} not found.")
+        meta_path = self._meta_path(blob_name, prod_dev, container_name)
+        try:
+            metadata = json.loads(meta_path.read_text())
+        except FileNotFoundError:
+            metadata = {}
+        return {"name": blob_name, **props, "metadata": metadata}
+
+    def upload(
+        self,
+        blob_name,
+        data,
+        prod_dev="dev",
+        container_name="projects",
+        content_type="application/octet-stream",
+        metadata=None,
+        etag=None,
+        match_condition=None,
+    ):
+        path = self._path(blob_name, prod_dev, container_name)
+        meta_path = self._meta_path(blob_name, prod_dev, container_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif hasattr(data, "read"):
+            data = data.read()
+        # the condition check and the rename are atomic for threads of
+        # this process only, which is enough for local runs
+        with self._lock:
+            current = self._current_etag(path)
+            if match_condition == MatchConditions.IfMissing and current:
+                raise ResourceExistsError(f"{blob_name} already exists.")
+            if match_condition == MatchConditions.IfNotModified and (
+                current != etag
+            ):
+                raise ResourceModifiedError(f"{blob_name} was modified.")
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            meta_path.write_text(json.dumps(metadata or {}))
+            os.replace(tmp_path, path)
+            props = self._stat_props(path)
+        return {"etag": props["etag"], "last_modified": props["last_modified"]}
+
+    def list(
+        self, name_starts_with=None, prod_dev="dev", container_name="projects"
+    ):
+        container_dir = self.root / prod_dev / container_name
+        prefix = name_starts_with or ""
+        # only walk the deepest directory the prefix pins down
+        start_dir = container_dir / prefix.rpartition("/")[0]
+        blobs = []
+        for dirpath, _, filenames in os.walk(start_dir):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = Path(dirpath) / filename
+                name = path.relative_to(container_dir).as_posix()
+                if name.startswith(prefix):
+                    blobs.append({"name": name, **self._stat_props(path)})
+        return sorted(blobs, key=lambda x: x["name"])
+
+    def delete(self, blob_name, prod_dev="dev", container_name="projects"):
+        path = self._path(blob_name, prod_dev, container_name)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"The blob {blob_name} not found.")
+        self._meta_path(blob_name, prod_dev, container_name).unlink(
+            missing_ok=True
+        )
+
+    def url(self, blob_name, prod_dev="dev", container_name="projects"):
+        return str(self._path(blob_name, prod_dev, container_name))
+
+    def get_fs(self, prod_dev="dev"):
+        from fsspec.implementations.dirfs import DirFileSystem
+
+        class LocalDirFileSystem(DirFileSystem):
+            # wraps a sync filesystem; zarr (v3) would otherwise try to
+            # re-create it as an async one, which DirFileSystem can't be
+            async_impl = False
+
+        (self.root / prod_dev).mkdir(parents=True, exist_ok=True)
+        return LocalDirFileSystem(
+            path=str(self.root / prod_dev),
+            fs=fsspec.filesystem("file", auto_mkdir=True),
+        )
+
+
+def _backend_from_config(
+    kind: Literal["azure", "local"], local_root=None
+) -> StorageBackend:
+    if kind == "azure":
+        return AzureBlobStorage()
+    if kind == "local":
+        if local_root is None:
+            raise ValueError(
+                "The local storage backend needs a root directory "
+                "(DSCI_STORAGE_LOCAL_ROOT)."
+            )
+        return LocalStorage(local_root)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def get_storage_backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _backend_from_config(
+                    STORAGE_BACKEND, STORAGE_LOCAL_ROOT
+                )
+                if _backend.kind != "azure":
+                    logger.info(
+                        f"Using {_backend.kind} storage at "
+                        f"{STORAGE_LOCAL_ROOT}"
+                    )
+    return _backend
+
+
+def configure_storage(
+    kind: Literal["azure", "local"] = "azure", local_root=None
+) -> StorageBackend:
+    """Switch every blob helper to another backend, e.g.
+    configure_storage("local", "fixtures/blob") in a benchmark
+    notebook."""
+    global _backend
+    with _backend_lock:
+        _backend = _backend_from_config(kind, local_root)
+    return _backend
+
+
+def mirror_prefix(
+    name_starts_with: str,
+    source: StorageBackend,
+    target: StorageBackend,
+    prod_dev: Literal["prod", "dev"] = "dev",
+    container_name: str = "projects",
+) -> int:
+    """Copy every blob under the prefix, with its metadata (e.g. the
+    content hash skip-unchanged uploads compare), from source to target
+    (e.g. Azure to a local fixture tree), skipping blobs already there
+    with the same size. Returns the number copied."""
+    existing = {
+        b["name"]: b["size"]
+        for b in target.list(name_starts_with, prod_dev, container_name)
+    }
+    n_copied = 0
+    for props in source.list(name_starts_with, prod_dev, container_name):
+        if existing.get(props["name"]) == props["size"]:
+            continue
+        data, _ = source.download(props["name"], prod_dev, container_name)
+        metadata = source.get_properties(
+            props["name"], prod_dev, container_name
+        )["metadata"]
+        target.upload(
+            props["name"], data, prod_dev, container_name, metadata=metadata
+        )
+        n_copied += 1
+    logger.info(
+        f"Mirrored {n_copied} blobs under {container_name}/"
+        f"{name_starts_with}"
+    )
+    return n_copied
@@ -0,0 +1,96 @@
+from typing import Callable
+
+import xarray as xr
+
+from src.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _array_dims(arr) -> list:
+    """Dimension names of a Zarr array written by xarray (v3 metadata or
+    the v2 _ARRAY_DIMENSIONS attribute)."""
+    dims = getattr(getattr(arr, "metadata", None), "dimension_names", None)
+    return list(dims or arr.attrs.get("_ARRAY_DIMENSIONS", []))
+
+
+def truncate_zarr(mapper, dim: str, n: int):
+    """Resize every array along dim back to n entries and re-consolidate
+    the metadata, e.g. to undo a partly written append."""
+    # imported here: the monitoring job imports this module (through
+    # chirps_gefs and imerg) but never writes a cube, and its cluster
+    # doesn't install zarr
+    import zarr
+
+    group = zarr.open_group(mapper, mode="r+")
+    for _, arr in group.arrays():
+        dims = _array_dims(arr)
+        if dim in dims and arr.shape[dims.index(dim)] != n:
+            shape = list(arr.shape)
+            shape[dims.index(dim)] = n
+            arr.resize(tuple(shape))
+    zarr.consolidate_metadata(mapper)
+
+
+def write_zarr_batches(
+    mapper,
+    keys: list,
+    load_batch: Callable[[list], xr.Dataset | None],
+    dim: str,
+    chunk_size: int,
+    n_existing: int = 0,
+) -> int:
+    """Write load_batch(batch) along dim for successive batches of keys.
+
+    Batches are sized so each one fills the store's partial last chunk
+    and then whole chunks of chunk_size: to_zarr refuses to write a Zarr
+    chunk from more than one Dask chunk. load_batch may return None to
+    skip a batch. With n_existing=0 the store is (re)created, with Zarr
+    chunks of chunk_size along dim, otherwise appended to. Metadata is
+    consolidated once all batches are written; if one fails, an append
+    is rolled back to the n_existing entries it started from. Returns
+    the number of entries written along dim.
+    """
+    import zarr
+
+    n = n_existing
+    try:
+        while keys:
+            size = chunk_size - n % chunk_size
+            batch = keys[:size]
+            keys = keys[size:]
+            ds = load_batch(batch)
+            if ds is None:
+                continue
+            ds = ds.chunk({dim: chunk_size})
+            if n == 0:
+                # the first batch may be short, so set the Zarr chunks
+                # rather than have them follow its Dask chunks
+                encoding = {
+                    name: {
+                        "chunks": tuple(
+                            chunk_size if d == dim else c[0]
+                            for d, c in zip(var.dims, var.chunks)
+                        )
+                    }
+                    for name, var in ds.data_vars.items()
+                    if dim in var.dims
+                }
+                ds.to_zarr(
+                    mapper, mode="w", consolidated=False, encoding=encoding
+                )
+            else:
+                ds.to_zarr(
+                    mapper, mode="a", append_dim=dim, consolidated=False
+                )
+            n += ds.sizes[dim]
+    except Exception:
+        if n_existing > 0:
+            logger.warning(
+                f"Append along {dim} failed; rolling back to {n_existing}"
+            )
+            truncate_zarr(mapper, dim, n_existing)
+        raise
+    if n > n_existing:
+        zarr.consolidate_metadata(mapper)
+    return n - n_existing